@@ -1,22 +1,64 @@
 """! @brief The optimization builder class is defined."""
 
+import os
+import subprocess
 import casadi as cs
 from .sx_container import SXContainer
 from .spatialmath import arrayify_args, ArrayType, CasADiArrayType
 from .optimization import *
 from .models import Model, TaskModel, RobotModel
-from typing import List, Union
+from typing import List, Tuple, Union, Dict, Callable
 
 
 class OptimizationBuilder:
     """! OptimizationBuilder allows you to build/specify an optimization problem."""
 
+    ## Operations that are nonlinear in their arguments (see _likely_nonlinear).
+    nonlinear_ops = {
+        cs.OP_SQ,
+        cs.OP_SQRT,
+        cs.OP_POW,
+        cs.OP_CONSTPOW,
+        cs.OP_EXP,
+        cs.OP_LOG,
+        cs.OP_INV,
+        cs.OP_SIN,
+        cs.OP_COS,
+        cs.OP_TAN,
+        cs.OP_ASIN,
+        cs.OP_ACOS,
+        cs.OP_ATAN,
+        cs.OP_ATAN2,
+        cs.OP_SINH,
+        cs.OP_COSH,
+        cs.OP_TANH,
+        cs.OP_NORM2,
+    }
+
+    ## Solvers that only use first-order derivatives, i.e. the Hessians are not required (see build).
+    gradient_only_solvers = {
+        "slsqp",
+        "gauss_newton",
+        "l-bfgs-b",
+        "bfgs",
+        "cg",
+        "tnc",
+        "cobyla",
+        "nelder-mead",
+        "powell",
+    }
+
     def __init__(
         self,
         T: int,
         robots: List[RobotModel] = [],
         tasks: List[TaskModel] = [],
         derivs_align: bool = False,
+        jit: bool = False,
+        jit_options: Dict = {},
+        jit_cache_dir: Union[None, str] = os.path.join("~", ".cache", "optas"),
+        expression_type: str = "SX",
+        expand: bool = True,
     ):
         """! OptimizationBuilder constructor.
 
@@ -24,11 +66,17 @@ class OptimizationBuilder:
         @param robots A list of robot models.
         @param tasks A list of task models.
         @param derivs_align When true, the time derivatives align for each time step. Default is False.
+        @param jit When true, the CasADi functions of the optimization problem are just-in-time compiled to native code. Default is False.
+        @param jit_options Options passed to the compiler used for just-in-time compilation, these update the defaults {"compiler": "gcc", "flags": ["-O3"]}. For example, pass {"compiler": "ccache gcc"} to use a caching compiler. Default is {}.
+        @param jit_cache_dir Directory where just-in-time compiled functions are cached, functions that were compiled previously (also by other processes) are loaded from the cache rather than compiled again. When None, functions are compiled on each build and the generated code is removed when the functions are destroyed. Default is "~/.cache/optas".
+        @param expression_type The CasADi symbolic type used to build the problem, either "SX" or "MX". SX is efficient for small problems, MX scales better with the number of time steps T since its expression graphs are not expanded into scalar operations. Default is "SX".
+        @param expand When true and expression_type is "MX", the expression graphs are expanded into scalar operations (i.e. SX) when the optimization problem is built, this gives the fast construction of MX and the fast evaluation of SX. Default is True.
         @return An instance of the OptimizationBuilder class.
         """
 
         # Input check
         assert T > 0, f"T must be strictly positive"
+        assert expression_type in {"SX", "MX"}, f"expression_type must be SX or MX"
 
         if not isinstance(robots, list):
             robots = [robots]  # allow user to pass a single robot
@@ -47,6 +95,21 @@ class OptimizationBuilder:
         ## When true, the time derivatives align for each time step.
         self.derivs_align = derivs_align
 
+        ## When true, the CasADi functions of the optimization problem are just-in-time compiled.
+        self.jit = jit
+
+        ## Options passed to the compiler used for just-in-time compilation.
+        self.jit_options = {"compiler": "gcc", "flags": ["-O3"], **jit_options}
+
+        ## Directory where just-in-time compiled functions are cached.
+        self.jit_cache_dir = jit_cache_dir
+
+        ## CasADi symbolic type (i.e. casadi.SX or casadi.MX) used to build the problem.
+        self._sym_type = getattr(cs, expression_type)
+
+        ## When true, MX expression graphs are expanded into scalar operations when the problem is built.
+        self.expand = expand and expression_type == "MX"
+
         # Ensure T is sufficiently large
         if not derivs_align and len(self._models) > 0:
             # Get max time deriv
@@ -74,6 +137,9 @@ class OptimizationBuilder:
         ## SXContainer containing the cost terms.
         self._cost_terms = SXContainer()
 
+        ## Sum of the cost terms, this is accumulated as cost terms are added.
+        self._cost_sum = self._sym_type(0)
+
         ## SXContainer containing the linear equality constraints.
         self._lin_eq_constraints = SXContainer()
 
@@ -88,15 +154,33 @@ class OptimizationBuilder:
 
         # Setup decision variables and parameters
         for model in self._models:
-            for d in model.time_derivs:
+            if isinstance(model, RobotModel):
+                dim, is_discrete = model.num_opt_joints, False
+            else:
+                dim, is_discrete = model.dim, model.is_discrete
+            n = [T - d if not derivs_align else T for d in model.time_derivs]
+
+            # The states for every time derivative are sliced from a
+            # single symbol, note that this is only possible for SX
+            # since slices of MX symbols are not valid function inputs
+            if self._sym_type is cs.SX:
+                states = cs.SX.sym(model.get_name(), dim, sum(n))
+            else:
+                states = None
+
+            offset = 0
+            for d, t in zip(model.time_derivs, n):
                 n_s_x = model.state_optimized_name(d)
-                t = T - d if not derivs_align else T
+                if states is not None:
+                    x = states[:, offset : offset + t]
+                    self._add_decision_variables(n_s_x, x, is_discrete)
+                else:
+                    self.add_decision_variables(n_s_x, dim, t, is_discrete)
+                offset += t
+
                 if isinstance(model, RobotModel):
-                    self.add_decision_variables(n_s_x, model.num_opt_joints, t)
                     n_s_p = model.state_parameter_name(d)
                     self.add_parameter(n_s_p, model.num_param_joints, t)
-                else:
-                    self.add_decision_variables(n_s_x, model.dim, t, model.is_discrete)
 
     def get_model_names(self) -> List[str]:
         """! Return the names of each model.
@@ -194,7 +278,7 @@ class OptimizationBuilder:
         states = self.get_model_states(name, time_deriv=time_deriv)
         parameters = self.get_model_parameters(name, time_deriv=time_deriv)
 
-        states_and_params = cs.SX.zeros(model.dim, max(1, self.T - time_deriv))
+        states_and_params = self._sym_type.zeros(model.dim, max(1, self.T - time_deriv))
         for idx in range(model.num_param_joints):
             states_and_params[model.parameter_joint_indexes[idx], :] = parameters[
                 idx, :
@@ -204,40 +288,166 @@ class OptimizationBuilder:
         return states_and_params
 
     def _x(self) -> CasADiArrayType:
-        """! Return the decision variables as a casadi.SX vector.
+        """! Return the decision variables as a symbolic vector.
 
         @return Symbolic decision variables.
         """
         return self._decision_variables.vec()
 
     def _p(self) -> CasADiArrayType:
-        """! Return the parameters as a casadi.SX vector.
+        """! Return the parameters as a symbolic vector.
 
         @return Symbolic parameters.
         """
         return self._parameters.vec()
 
-    def _is_linear_in_x(self, y: cs.SX) -> cs.DM:
+    def _likely_nonlinear(self, y: CasADiArrayType, max_checks: int = 8) -> bool:
+        """! Cheap check for nonlinearity that inspects the top-level operation of the first few elements of y (or y itself when it is an MX), unlike casadi.is_linear the expression graph is not differentiated.
+
+        @param y Symbolic function of interest.
+        @param max_checks Maximum number of elements that are inspected. Default is 8.
+        @return True when y is nonlinear in x, False when undetermined (i.e. y may still be nonlinear).
+        """
+        x = self._x()
+        if isinstance(y, cs.MX):
+            elements = [y]
+        else:
+            elements = [y.nz[i] for i in range(min(y.nnz(), max_checks))]
+
+        for y_i in elements:
+            if y_i.is_symbolic() or y_i.is_constant():
+                continue
+            op = y_i.op()
+            if op in self.nonlinear_ops:
+                deps = [y_i.dep(i) for i in range(y_i.n_dep())]
+                nonlinear = any(cs.depends_on(dep, x) for dep in deps)
+            elif op in {cs.OP_MUL, cs.OP_DOT}:
+                nonlinear = cs.depends_on(y_i.dep(0), x) and cs.depends_on(
+                    y_i.dep(1), x
+                )
+            elif op == cs.OP_DIV:
+                nonlinear = cs.depends_on(y_i.dep(1), x)  # x in the denominator
+            else:
+                nonlinear = False
+            if nonlinear:
+                return True
+
+        return False
+
+    def _is_linear_in_x(self, y: CasADiArrayType) -> cs.DM:
         """! Returns true DM(1) if y is a linear function of the decision variables, false DM(0) otherwise.
 
         @param y Symbolic function of interest.
         @return True if y is linear in x.
         """
-        return cs.is_linear(y, self._x())
+        if self._likely_nonlinear(y):
+            return cs.DM(0)  # skips the full check
+        return cs.is_linear(*self._expand_in_x(y))
+
+    def _expand_in_x(self, y: CasADiArrayType) -> Tuple[CasADiArrayType]:
+        """! Return y and the decision variables, for MX these are replaced by an expanded (i.e. SX) copy since function calls (e.g. from Function.map) hide the structure of an MX expression from casadi.is_linear and casadi.is_quadratic.
+
+        @param y Symbolic function of interest.
+        @return The function y and the decision variables x. When y is an MX that can't be expanded, the MX expressions are returned.
+        """
+        x = self._x()
+        if self._sym_type is not cs.MX:
+            return y, x
+        p = self._p()
+        try:
+            fun = cs.Function("y", [x, p], [y]).expand()
+        except RuntimeError:
+            return y, x
+        x = cs.SX.sym("x", x.shape)
+        return fun(x, cs.SX.sym("p", p.shape)), x
+
+    def _function_options(self) -> Dict:
+        """! Return the options passed to the constructor of each CasADi function in the optimization problem.
+
+        @return Dictionary containing the function options.
+        """
+        options = {}
+        if self.expand:
+            options["expand"] = True
+        if not self.jit:
+            return options
+        jit_options = self.jit_options
+        if self.jit_cache_dir is not None:
+            jit_options = {**jit_options, "directory": self.jit_cache_dir}
+        return {
+            **options,
+            "jit": True,
+            "compiler": "shell",
+            "jit_options": jit_options,
+        }
+
+    def _solver_options(self) -> Dict:
+        """! Return the default options passed to CasADi solvers for the optimization problem.
+
+        @return Dictionary containing the solver options.
+        """
+        if self.expand:
+            return {"expand": True}
+        return {}
 
     def _cost(self) -> CasADiArrayType:
         """! Returns the cost function.
 
         @return The symbolic cost function.
         """
-        return cs.sum1(self._cost_terms.vec())
+        return self._cost_sum
+
+    def _map_stage(
+        self,
+        name: str,
+        fn: Callable,
+        model_name: str,
+        time_deriv: int,
+        args: List[CasADiArrayType],
+        parallelization: str,
+        n_threads: Union[None, int],
+        reduce_out: bool,
+    ) -> CasADiArrayType:
+        """! Evaluate a per time-step function over the state trajectory of a model using a mapped CasADi function.
+
+        The stage function is constructed once from symbols with the shape of a single state, and then mapped over the time-steps of the trajectory rather than being unrolled for each time-step. The arguments in args are the same for every time-step. Note, parallel evaluation is only retained for problems built with expression_type="MX" and expand=False, otherwise the mapped function is expanded into scalar operations.
+
+        @param name Name of the stage function.
+        @param fn Function with signature fn(x_t, *args) that returns a symbolic array for the state x_t at a single time-step.
+        @param model_name Name of the model.
+        @param time_deriv The time-deriviative required (i.e. position is 0, velocity is 1, etc.).
+        @param args Arguments passed to fn that are the same for every time-step.
+        @param parallelization Evaluation strategy for the mapped function, either "serial", "unroll", "openmp", or "thread".
+        @param n_threads Number of threads used when parallelization is "thread", if None then the number of CPUs is used.
+        @param reduce_out When true, the outputs are summed over the time-steps.
+        @return The output of the mapped stage function.
+        """
+        args = [arg if isinstance(arg, (cs.SX, cs.MX)) else cs.DM(arg) for arg in args]
+        states = self.get_model_states(model_name, time_deriv)
+        dim, n = states.shape
+        x_t = self._sym_type.sym("x", dim)
+        arg_syms = [
+            self._sym_type.sym(f"a{i}", *arg.shape) for i, arg in enumerate(args)
+        ]
+        stage = cs.Function(
+            "stage_" + name, [x_t] + arg_syms, [cs.vec(fn(x_t, *arg_syms))]
+        )
+        if parallelization == "thread":
+            n_threads = os.cpu_count() if n_threads is None else n_threads
+            mapped = stage.map(n, parallelization, n_threads)
+        else:
+            mapped = stage.map(n, parallelization)
+        out = mapped(states, *[cs.repmat(arg, 1, n) for arg in args])
+        if reduce_out:
+            out = cs.sum2(out)
+        return out
 
     def is_cost_quadratic(self) -> cs.DM:
         """! True DM(1) when cost function is quadratic in the decision variables, False DM(0) otherwise.
 
         @return Truth value if the cost function is quadratic or not.
         """
-        return cs.is_quadratic(self._cost(), self._x())
+        return cs.is_quadratic(*self._expand_in_x(self._cost()))
 
     #
     # Upate optimization problem
@@ -245,7 +455,7 @@ class OptimizationBuilder:
 
     def add_decision_variables(
         self, name: str, m: int = 1, n: int = 1, is_discrete: bool = False
-    ) -> cs.SX:
+    ) -> CasADiArrayType:
         """! Add decision variables to the optimization problem.
 
         @param name Name of decision variable array.
@@ -254,13 +464,24 @@ class OptimizationBuilder:
         @param is_discret If true, then the decision variables are treated as discrete variables. Default is False.
         @return Array of the decision variables.
         """
-        x = cs.SX.sym(name, m, n)
+        x = self._sym_type.sym(name, m, n)
+        self._add_decision_variables(name, x, is_discrete)
+        return x
+
+    def _add_decision_variables(
+        self, name: str, x: CasADiArrayType, is_discrete: bool
+    ) -> None:
+        """! Add an array of symbolic variables as decision variables.
+
+        @param name Name of decision variable array.
+        @param x Array of symbolic variables.
+        @param is_discrete If true, then the decision variables are treated as discrete variables.
+        """
         self._decision_variables[name] = x
         if is_discrete:
             self._decision_variables.variable_is_discrete(name)
-        return x
 
-    def add_parameter(self, name: str, m: int = 1, n: int = 1) -> cs.SX:
+    def add_parameter(self, name: str, m: int = 1, n: int = 1) -> CasADiArrayType:
         """! Add a parameter to the optimization problem.
 
         @param name Name of parameter array.
@@ -268,12 +489,12 @@ class OptimizationBuilder:
         @param n Number of columns in parameter array. Default is 1.
         @return Array of the parameters.
         """
-        p = cs.SX.sym(name, m, n)
+        p = self._sym_type.sym(name, m, n)
         self._parameters[name] = p
         return p
 
     @arrayify_args
-    def add_cost_term(self, name: str, cost_term: cs.SX) -> None:
+    def add_cost_term(self, name: str, cost_term: CasADiArrayType) -> None:
         """! Add cost term to the optimization problem.
 
         @param name Name for cost function.
@@ -283,6 +504,41 @@ class OptimizationBuilder:
         m, n = cost_term.shape
         assert m == 1 and n == 1, "cost term must be scalar"
         self._cost_terms[name] = cost_term
+        self._cost_sum = self._cost_sum + cost_term
+
+    def add_stage_cost(
+        self,
+        name: str,
+        fn: Callable,
+        model_name: str,
+        time_deriv: int = 0,
+        args: List[CasADiArrayType] = [],
+        parallelization: str = "serial",
+        n_threads: Union[None, int] = None,
+    ) -> None:
+        """! Add a cost term that is the sum of a per time-step cost over the state trajectory of a model.
+
+        This is equivalent to adding the cost term sum_t fn(x_t, *args), however the stage cost is evaluated using a mapped CasADi function (see _map_stage).
+
+        @param name Name for cost function.
+        @param fn Function with signature fn(x_t, *args) that returns the scalar cost for the state x_t at a single time-step.
+        @param model_name Name of the model.
+        @param time_deriv The time-deriviative required (i.e. position is 0, velocity is 1, etc.). Default is 0.
+        @param args Arguments passed to fn that are the same for every time-step, e.g. parameters. Default is [].
+        @param parallelization Evaluation strategy for the mapped function, either "serial", "unroll", "openmp", or "thread". Default is "serial".
+        @param n_threads Number of threads used when parallelization is "thread", if None then the number of CPUs is used. Default is None.
+        """
+        cost_term = self._map_stage(
+            name,
+            fn,
+            model_name,
+            time_deriv,
+            args,
+            parallelization,
+            n_threads,
+            reduce_out=True,
+        )
+        self.add_cost_term(name, cost_term)
 
     @arrayify_args
     def add_geq_inequality_constraint(
@@ -331,8 +587,51 @@ class OptimizationBuilder:
         @param mid Middle part of the inequality constraint.
         @param rhs Right-hand side for the inequality constraint.
         """
-        self.add_leq_inequality_constraint(name + "_l", lhs, mid)
-        self.add_leq_inequality_constraint(name + "_r", mid, rhs)
+        diff_l = mid - lhs  # diff_l >= 0
+        diff_r = rhs - mid  # diff_r >= 0
+
+        # Check linearity of both sides at once, note if either side
+        # is nonlinear then both are treated as nonlinear
+        if self._is_linear_in_x(cs.vertcat(cs.vec(diff_l), cs.vec(diff_r))):
+            self._lin_ineq_constraints[name + "_l"] = diff_l
+            self._lin_ineq_constraints[name + "_r"] = diff_r
+        else:
+            self._ineq_constraints[name + "_l"] = diff_l
+            self._ineq_constraints[name + "_r"] = diff_r
+
+    def add_stage_inequality_constraint(
+        self,
+        name: str,
+        fn: Callable,
+        model_name: str,
+        time_deriv: int = 0,
+        args: List[CasADiArrayType] = [],
+        parallelization: str = "serial",
+        n_threads: Union[None, int] = None,
+    ) -> None:
+        """! Add the inequality constraint fn(x_t, *args) >= 0 for every time-step of the state trajectory of a model.
+
+        The stage constraint is evaluated using a mapped CasADi function (see _map_stage). The constraints for all time-steps are added as a single constraint with shape m-by-T, where m is the number of outputs of fn.
+
+        @param name Name for the constraint.
+        @param fn Function with signature fn(x_t, *args) that returns the constraint for the state x_t at a single time-step.
+        @param model_name Name of the model.
+        @param time_deriv The time-deriviative required (i.e. position is 0, velocity is 1, etc.). Default is 0.
+        @param args Arguments passed to fn that are the same for every time-step, e.g. parameters. Default is [].
+        @param parallelization Evaluation strategy for the mapped function, either "serial", "unroll", "openmp", or "thread". Default is "serial".
+        @param n_threads Number of threads used when parallelization is "thread", if None then the number of CPUs is used. Default is None.
+        """
+        diff = self._map_stage(
+            name,
+            fn,
+            model_name,
+            time_deriv,
+            args,
+            parallelization,
+            n_threads,
+            reduce_out=False,
+        )
+        self.add_geq_inequality_constraint(name, diff)
 
     @arrayify_args
     def add_equality_constraint(
@@ -359,6 +658,40 @@ class OptimizationBuilder:
         else:
             self._eq_constraints[name] = diff
 
+    def add_stage_equality_constraint(
+        self,
+        name: str,
+        fn: Callable,
+        model_name: str,
+        time_deriv: int = 0,
+        args: List[CasADiArrayType] = [],
+        parallelization: str = "serial",
+        n_threads: Union[None, int] = None,
+    ) -> None:
+        """! Add the equality constraint fn(x_t, *args) == 0 for every time-step of the state trajectory of a model.
+
+        The stage constraint is evaluated using a mapped CasADi function (see _map_stage). The constraints for all time-steps are added as a single constraint with shape m-by-T, where m is the number of outputs of fn.
+
+        @param name Name for the constraint.
+        @param fn Function with signature fn(x_t, *args) that returns the constraint for the state x_t at a single time-step.
+        @param model_name Name of the model.
+        @param time_deriv The time-deriviative required (i.e. position is 0, velocity is 1, etc.). Default is 0.
+        @param args Arguments passed to fn that are the same for every time-step, e.g. parameters. Default is [].
+        @param parallelization Evaluation strategy for the mapped function, either "serial", "unroll", "openmp", or "thread". Default is "serial".
+        @param n_threads Number of threads used when parallelization is "thread", if None then the number of CPUs is used. Default is None.
+        """
+        diff = self._map_stage(
+            name,
+            fn,
+            model_name,
+            time_deriv,
+            args,
+            parallelization,
+            n_threads,
+            reduce_out=False,
+        )
+        self.add_equality_constraint(name, diff)
+
     #
     # Common constraints
     #
@@ -442,7 +775,7 @@ class OptimizationBuilder:
         if isinstance(dt, (float, int)):
             dt = dt * cs.DM.ones(n)
 
-        if isinstance(dt, (cs.DM, cs.SX)):
+        if isinstance(dt, (cs.DM, cs.SX, cs.MX)):
             dt = cs.vec(dt)
             if dt.shape[0] == 1:
                 dt = dt * cs.DM.ones(n)
@@ -542,8 +875,22 @@ class OptimizationBuilder:
     # Main build method
     #
 
-    def build(self) -> Optimization:
-        """! Build the optimization problem."""
+    def build(self, solver_hint: Union[None, str] = None) -> Optimization:
+        """! Build the optimization problem.
+
+        @param solver_hint Name of the solver (or Scipy method) that will be used to solve the problem. When the solver only uses first-order derivatives (see gradient_only_solvers), the Hessians of the cost function and constraints are not derived. When None, the Hessians are derived. Default is None.
+        @return The optimization problem.
+        """
+
+        # Keyword arguments passed to the optimization problem
+        derive_hessians = (solver_hint is None) or (
+            solver_hint.lower() not in self.gradient_only_solvers
+        )
+        kwargs = {
+            "function_options": self._function_options(),
+            "solver_options": self._solver_options(),
+            "derive_hessians": derive_hessians,
+        }
 
         # Setup optimization
         nlin = (
@@ -565,6 +912,7 @@ class OptimizationBuilder:
                     self._lin_ineq_constraints,
                     self._eq_constraints,
                     self._ineq_constraints,
+                    **kwargs,
                 )
             else:
                 if nnlin > 0:
@@ -576,6 +924,7 @@ class OptimizationBuilder:
                         self._lin_ineq_constraints,
                         self._eq_constraints,
                         self._ineq_constraints,
+                        **kwargs,
                     )
                 elif nlin > 0:
                     opt = QuadraticCostLinearConstraints(
@@ -584,12 +933,14 @@ class OptimizationBuilder:
                         self._cost_terms,
                         self._lin_eq_constraints,
                         self._lin_ineq_constraints,
+                        **kwargs,
                     )
                 else:
                     opt = QuadraticCostUnconstrained(
                         self._decision_variables,
                         self._parameters,
                         self._cost_terms,
+                        **kwargs,
                     )
         else:
             # False -> use (nonlinear) Optimization formulation
@@ -603,6 +954,7 @@ class OptimizationBuilder:
                     self._lin_ineq_constraints,
                     self._eq_constraints,
                     self._ineq_constraints,
+                    **kwargs,
                 )
             else:
                 if nnlin > 0:
@@ -614,6 +966,7 @@ class OptimizationBuilder:
                         self._lin_ineq_constraints,
                         self._eq_constraints,
                         self._ineq_constraints,
+                        **kwargs,
                     )
                 elif nlin > 0:
                     opt = NonlinearCostLinearConstraints(
@@ -622,14 +975,58 @@ class OptimizationBuilder:
                         self._cost_terms,
                         self._lin_eq_constraints,
                         self._lin_ineq_constraints,
+                        **kwargs,
                     )
                 else:
                     opt = NonlinearCostUnconstrained(
                         self._decision_variables,
                         self._parameters,
                         self._cost_terms,
+                        **kwargs,
                     )
 
         opt.set_models(self._models)
 
         return opt
+
+    def build_aot(
+        self,
+        out_dir: str = "gen",
+        compiler: str = "gcc",
+        flags: List[str] = ["-O3", "-march=native"],
+        solver_hint: Union[None, str] = None,
+    ) -> Tuple[Optimization, Dict[str, str]]:
+        """! Build the optimization problem, and compile its CasADi functions ahead-of-time to shared libraries.
+
+        C code is generated for each CasADi function of the optimization problem (e.g. f, df, v, dv) and compiled to a shared library named after the attribute, e.g. OUT_DIR/df.so. The compiled functions can be loaded, for example in a deployed application, using casadi.external(name, path). Note, external functions can only be evaluated numerically (e.g. by the Scipy, OSQP, or CVXOPT solver interfaces), they can not be differentiated.
+
+        @param out_dir Directory where the generated code and shared libraries are saved. Default is "gen".
+        @param compiler The C compiler. Default is "gcc".
+        @param flags Flags passed to the compiler. Default is ["-O3", "-march=native"], note "-ffast-math" is not included by default since it does not respect IEEE semantics for inf/nan (e.g. infinite bounds).
+        @param solver_hint See build. Default is None.
+        @return The optimization problem, and a dictionary that maps the name of each function to the path of its shared library.
+        """
+        opt = self.build(solver_hint=solver_hint)
+        os.makedirs(out_dir, exist_ok=True)
+
+        paths = {}
+        for name, fun in vars(opt).items():
+            if name.startswith("_") or not isinstance(fun, cs.Function):
+                continue
+
+            # Wrap the function so the generated symbol is named after the attribute
+            if fun.name() != name:
+                args = fun.mx_in()
+                fun = cs.Function(name, args, fun.call(args))
+
+            codegen = cs.CodeGenerator(name + ".c", {"with_header": True})
+            codegen.add(fun)
+            src = codegen.generate(out_dir + os.sep)
+            lib = os.path.join(out_dir, name + ".so")
+            subprocess.run(
+                [*compiler.split(), *flags, "-shared", "-fPIC", src, "-o", lib],
+                check=True,
+            )
+            paths[name] = lib
+
+        return opt, paths
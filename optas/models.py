@@ -1,5 +1,6 @@
 """! @brief Several Model classes are defined."""
 import os
+import sys
 import warnings
 import functools
 import pathlib
@@ -76,6 +77,19 @@ def deprecation_warning(name_to):
     return decorator
 
 
+@functools.lru_cache(maxsize=None)
+def _state_name(name: str, symbol: str, time_deriv: int, suffix: str) -> str:
+    """! Return the name {name}/{d}{symbol}{suffix} of a model state, names are cached and interned since they are requested many times when building an optimization problem.
+
+    @param name Name of the model.
+    @param symbol Symbol for the model state.
+    @param time_deriv The time-deriviative required (i.e. position is 0, velocity is 1, etc.)
+    @param suffix String appended to the name.
+    @return The state name.
+    """
+    return sys.intern(name + "/" + "d" * time_deriv + symbol + suffix)
+
+
 class Model:
     """! The Model base class.
     Defines the base class utilized by all models.
@@ -136,7 +150,7 @@ class Model:
         assert (
             time_deriv in self.time_derivs
         ), f"Given time derivative time_deriv={time_deriv} is not recognized, only allowed {self.time_derivs}"
-        return self.name + "/" + "d" * time_deriv + self.symbol
+        return _state_name(self.name, self.symbol, time_deriv, "")
 
     def state_parameter_name(self, time_deriv: int) -> str:
         """! Return the parameter name.
@@ -147,7 +161,7 @@ class Model:
         assert (
             time_deriv in self.time_derivs
         ), f"Given time derivative time_deriv={time_deriv} is not recognized, only allowed {self.time_derivs}"
-        return self.name + "/" + "d" * time_deriv + self.symbol + "/" + "p"
+        return _state_name(self.name, self.symbol, time_deriv, "/p")
 
     def state_optimized_name(self, time_deriv: int) -> str:
         """! Return the sate optimized name.
@@ -158,7 +172,7 @@ class Model:
         assert (
             time_deriv in self.time_derivs
         ), f"Given time derivative time_deriv={time_deriv} is not recognized, only allowed {self.time_derivs}"
-        return self.name + "/" + "d" * time_deriv + self.symbol + "/" + "x"
+        return _state_name(self.name, self.symbol, time_deriv, "/x")
 
     def get_limits(self, time_deriv: int) -> Tuple[ArrayType]:
         """! Return the model limits.
@@ -1,12 +1,83 @@
+import os
+import hashlib
 import casadi as cs
 from .models import Model
 from .sx_container import SXContainer
-from .spatialmath import CasADiArrayType
-from typing import List, Tuple
+from .spatialmath import ArrayType, CasADiArrayType
+from typing import List, Tuple, Dict, Union
+
+
+def create_function(
+    name: str,
+    inputs: List[CasADiArrayType],
+    outputs: List[CasADiArrayType],
+    opts: Dict = {},
+) -> cs.Function:
+    """! Create a CasADi function.
+
+    When the option "expand" is true and the inputs are MX symbols, the expression graph is expanded into scalar operations (i.e. SX) which are faster to evaluate. When just-in-time compilation is enabled, common subexpressions in the outputs are eliminated before the function is compiled, this reduces the size of the generated code. When also a directory is given in the jit options, compiled functions are cached in that directory. The cache is keyed by the SHA1 hash of the serialized function and the compiler options, a function found in the cache is loaded and linked with the previously compiled shared library rather than being compiled again. When loading fails (e.g. the shared library was removed from the cache), the function is compiled again.
+
+    @param name The function name.
+    @param inputs The symbolic inputs of the function.
+    @param outputs The symbolic outputs of the function.
+    @param opts Options passed to the constructor of the CasADi function. Default is {}.
+    @return The CasADi function.
+    """
+    opts = opts.copy()
+    if opts.pop("expand", False) and any(isinstance(i, cs.MX) for i in inputs):
+        fun = cs.Function(name, inputs, outputs).expand()
+        inputs = fun.sx_in()
+        outputs = fun.call(inputs)
+
+    if opts.get("jit", False):
+        outputs = [cs.cse(output) for output in outputs]
+
+    jit_options = opts.get("jit_options", {})
+    if not (opts.get("jit", False) and "directory" in jit_options):
+        return cs.Function(name, inputs, outputs, opts)
+
+    # Hash the function and compiler options
+    sha1 = hashlib.sha1(cs.Function(name, inputs, outputs).serialize().encode())
+    sha1.update(repr(sorted(jit_options.items())).encode())
+    jit_name = f"optas_{name}_{sha1.hexdigest()}"
+
+    # Load the function when it has already been compiled
+    directory = os.path.expanduser(jit_options["directory"])
+    filename = os.path.join(directory, jit_name + ".casadi")
+    if os.path.isfile(filename):
+        try:
+            return cs.Function.load(filename)
+        except RuntimeError:
+            pass  # e.g. the compiled library was removed, so compile it again
+
+    # Compile the function and add it to the cache
+    os.makedirs(directory, exist_ok=True)
+    fun_opts = {
+        **opts,
+        "jit_name": jit_name,
+        "jit_temp_suffix": False,
+        "jit_cleanup": False,
+        "jit_serialize": "link",  # loaded functions link the compiled library
+        "jit_options": {
+            **jit_options,
+            "directory": directory + os.sep,
+            "cleanup": False,
+        },
+    }
+    fun = cs.Function(name, inputs, outputs, fun_opts)
+    fun.save(filename + ".tmp")
+    os.replace(filename + ".tmp", filename)  # other processes may share the cache
+
+    return fun
 
 
 def derive_jacobian_and_hessian_functions(
-    name: str, fun: cs.Function, x: CasADiArrayType, p: CasADiArrayType
+    name: str,
+    fun: cs.Function,
+    x: CasADiArrayType,
+    p: CasADiArrayType,
+    opts: Dict = {},
+    hessian: bool = True,
 ) -> Tuple[cs.Function]:
     """! Compute the Jacobian and Hessian for a given function using automatic differentiation.
 
@@ -14,21 +85,140 @@ def derive_jacobian_and_hessian_functions(
     @param fun The CasADi function.
     @param x The variables of the function.
     @param p The parameters of the function.
+    @param opts Options passed to the constructor of the CasADi functions. Default is {}.
+    @param hessian When false, the Hessian is not derived and None is returned in its place. Default is True.
     @return The Jacobian and Hessian that are the derivatives of the function wrt the variables x.
     """
     fun_input = [x, p]
     jac = cs.jacobian(fun(x, p), x)
+    Jac = create_function("d" + name, fun_input, [jac], opts)
+    if not hessian:
+        return Jac, None
     hes = cs.jacobian(jac, x)
-    Jac = cs.Function("d" + name, fun_input, [jac])
-    Hes = cs.Function("dd" + name, fun_input, [hes])
+    Hes = create_function("dd" + name, fun_input, [hes], opts)
     return Jac, Hes
 
 
+def derive_gradient_and_hessian_functions(
+    name: str,
+    fun: cs.Function,
+    x: CasADiArrayType,
+    p: CasADiArrayType,
+    opts: Dict = {},
+    hessian: bool = True,
+) -> Tuple[cs.Function]:
+    """! Compute the Jacobian and Hessian for a given scalar function using automatic differentiation.
+
+    Unlike derive_jacobian_and_hessian_functions, the Hessian is computed with casadi.hessian which reuses the gradient and exploits the symmetry of the Hessian.
+
+    @param name The function name.
+    @param fun The CasADi function, this must have a scalar output.
+    @param x The variables of the function.
+    @param p The parameters of the function.
+    @param opts Options passed to the constructor of the CasADi functions. Default is {}.
+    @param hessian When false, the Hessian is not derived and None is returned in its place. Default is True.
+    @return The Jacobian (i.e. the transposed gradient) and Hessian that are the derivatives of the function wrt the variables x.
+    """
+    fun_input = [x, p]
+    if not hessian:
+        grad = cs.gradient(fun(x, p), x)
+        return create_function("d" + name, fun_input, [grad.T], opts), None
+    hes, grad = cs.hessian(fun(x, p), x)
+    Jac = create_function("d" + name, fun_input, [grad.T], opts)
+    Hes = create_function("dd" + name, fun_input, [hes], opts)
+    return Jac, Hes
+
+
+def derive_linear_jacobian_and_hessian_functions(
+    name: str,
+    fun: cs.Function,
+    x: CasADiArrayType,
+    p: CasADiArrayType,
+    opts: Dict = {},
+    hessian: bool = True,
+) -> Tuple[cs.Function]:
+    """! Compute the Jacobian and Hessian for a given function that is linear in the variables x.
+
+    The Hessian of a linear function is identically zero, so rather than being derived using automatic differentiation it is given by a structurally zero array.
+
+    @param name The function name.
+    @param fun The CasADi function, this must be linear in x.
+    @param x The variables of the function.
+    @param p The parameters of the function.
+    @param opts Options passed to the constructor of the CasADi functions. Default is {}.
+    @param hessian When false, the Hessian is not derived and None is returned in its place. Default is True.
+    @return The Jacobian and Hessian that are the derivatives of the function wrt the variables x.
+    """
+    fun_input = [x, p]
+    jac = cs.jacobian(fun(x, p), x)
+    Jac = create_function("d" + name, fun_input, [jac], opts)
+    if not hessian:
+        return Jac, None
+    hes = cs.DM(jac.numel(), x.numel())
+    Hes = create_function("dd" + name, fun_input, [hes], opts)
+    return Jac, Hes
+
+
+def derive_jacobian_transpose_times_function(
+    name: str,
+    fun: cs.Function,
+    x: CasADiArrayType,
+    p: CasADiArrayType,
+    opts: Dict = {},
+) -> cs.Function:
+    """! Compute the product of the transposed Jacobian of a given function with a vector, i.e. J(x, p)'.v.
+
+    The product is derived using a reverse mode sweep, so the Jacobian matrix is not formed.
+
+    @param name The function name.
+    @param fun The CasADi function.
+    @param x The variables of the function.
+    @param p The parameters of the function.
+    @param opts Options passed to the constructor of the CasADi function. Default is {}.
+    @return A CasADi function with inputs x, p, and v that evaluates the product of the transposed Jacobian wrt the variables x and v.
+    """
+    f = fun(x, p)
+    v = type(x).sym("v", f.numel())
+    jtv = cs.jtimes(f, x, v, True)
+    return create_function("d" + name + "_transpose_times", [x, p, v], [jtv], opts)
+
+
+def derive_fused_function(
+    name: str,
+    funs: List[CasADiArrayType],
+    x: CasADiArrayType,
+    p: CasADiArrayType,
+    opts: Dict = {},
+) -> cs.Function:
+    """! Fuse several functions and their Jacobians into a single CasADi function.
+
+    Given the symbolic outputs f1(x, p), ..., fn(x, p), the returned function evaluates
+
+        [f1(x, p), ..., fn(x, p), J1(x, p), ..., Jn(x, p)]
+
+    where Ji is the Jacobian of fi wrt x. Subexpressions shared by the functions are evaluated once per call, and the Jacobians are derived in a single sweep.
+
+    @param name The function name.
+    @param funs The symbolic outputs of the functions.
+    @param x The variables of the functions.
+    @param p The parameters of the functions.
+    @param opts Options passed to the constructor of the CasADi function. Default is {}.
+    @return A CasADi function that evaluates the functions and their Jacobians.
+    """
+    jac = cs.jacobian(cs.vertcat(*funs), x)
+    offsets = [0]
+    for fun in funs:
+        offsets.append(offsets[-1] + fun.numel())
+    jacs = cs.vertsplit(jac, offsets)
+    return create_function(name, [x, p], funs + jacs, opts)
+
+
 def vertcon(
     x: CasADiArrayType,
     p: CasADiArrayType,
     ineq: List[cs.Function] = [],
     eq: List[cs.Function] = [],
+    opts: Dict = {},
 ) -> cs.Function:
     """! Align inequality and equality constraints vertically.
 
@@ -42,13 +232,66 @@ def vertcon(
     @param p The parameters of the functions.
     @param ineq A list of inequality constraints.
     @param eq A list of equality constraints.
+    @param opts Options passed to the constructor of the CasADi function. Default is {}.
     @return A CasADi function that evaluates the constraints in the form v(x, p) >= 0 (see above).
     """
     con = [i(x, p) for i in ineq]
     for e in eq:
         con.append(e(x, p))
         con.append(-e(x, p))
-    return cs.Function("v", [x, p], [cs.vertcat(*con)])
+    return create_function("v", [x, p], [cs.vertcat(*con)], opts)
+
+
+class FunctionBuffer:
+    """! Evaluates a CasADi function using preallocated input and output arrays, see casadi.Function.buffer."""
+
+    def __init__(self, fun: cs.Function):
+        """! Initializer for the FunctionBuffer class.
+
+        @param fun The CasADi function, the inputs must be dense.
+        @return Instance of the FunctionBuffer class.
+        """
+
+        ## The CasADi function.
+        self.fun = fun
+
+        ## CasADi buffer, and the method that evaluates the function.
+        self._buffer, self._eval = fun.buffer()
+
+        ## Preallocated inputs.
+        self._args = [cs.np.zeros(fun.nnz_in(i)) for i in range(fun.n_in())]
+
+        ## Preallocated nonzeros of the outputs.
+        self._res = [cs.np.zeros(fun.nnz_out(i)) for i in range(fun.n_out())]
+
+        ## Preallocated dense outputs.
+        self.out = [cs.np.zeros(fun.size_out(i)) for i in range(fun.n_out())]
+
+        ## Row/column indices of the nonzeros of the outputs.
+        self._nz = [
+            tuple(
+                cs.np.array(ind, dtype=int) for ind in fun.sparsity_out(i).get_triplet()
+            )
+            for i in range(fun.n_out())
+        ]
+
+        for i, arg in enumerate(self._args):
+            self._buffer.set_arg(i, memoryview(arg))
+        for i, res in enumerate(self._res):
+            self._buffer.set_res(i, memoryview(res))
+
+    def __call__(self, *args: ArrayType) -> List[cs.np.ndarray]:
+        """! Evaluate the function.
+
+        @param args The inputs of the function.
+        @return The dense outputs of the function. Note, these arrays are overwritten when the function is next evaluated.
+        """
+        for arg, value in zip(self._args, args):
+            arg[:] = value
+        self._eval()
+        for out, res, (row, col) in zip(self.out, self._res, self._nz):
+            out[row, col] = res
+        return self.out
 
 
 class Optimization:
@@ -57,21 +300,54 @@ class Optimization:
     ## big number rather than np.inf
     inf = 1.0e10
 
+    ## When true, the cost function is quadratic and its derivatives are derived with the terms P and q (see specify_quadratic_cost).
+    quadratic_cost = False
+
     def __init__(
         self,
         decision_variables: SXContainer,
         parameters: SXContainer,
         cost_terms: SXContainer,
+        function_options: Dict = {},
+        solver_options: Dict = {},
+        derive_hessians: bool = True,
     ):
         """! Initializer for the Optimization class.
 
         @param decision_variables SXContainer containing decision variables.
         @param parameters SXContainer containing parameters.
         @param cost_terms SXContainer containing cost terms.
+        @param function_options Options passed to the constructor of each CasADi function, e.g. to enable just-in-time compilation. Default is {}.
+        @param solver_options Default options passed to CasADi solvers for the optimization problem, e.g. {"expand": True}. Default is {}.
+        @param derive_hessians When false, the Hessians of the cost function and constraints are not derived (i.e. ddf, ddg, ddh, and ddv are None), this is useful for solvers that only require first-order derivatives. Note, for quadratic cost functions ddf is always given since it is required for the term P. Default is True.
         @return Instance of the Optimization class.
         """
         # Set class attributes
 
+        ## Options passed to the constructor of each CasADi function.
+        self.function_options = function_options
+
+        ## Default options passed to CasADi solvers, these are updated by user specified solver options.
+        self.solver_options = solver_options
+
+        ## When true, the Hessians of the cost function and constraints are derived.
+        self.derive_hessians = derive_hessians
+
+        ## Cache for the function buffers, see get_buffer.
+        self._buffers = {}
+
+        ## Cache for the mapped functions used by batch_evaluate.
+        self._batched_functions = {}
+
+        ## Cache for the transposed Jacobian-vector product functions, see get_jacobian_transpose_times.
+        self._transpose_times = {}
+
+        ## Sparsity patterns of the Jacobians of the cost function (key "f") and constraints (keys "k", "a", "g", "h", and "v"), see store_sparsity.
+        self.jac_sparsity = {}
+
+        ## Sparsity patterns of the Hessians of the cost function (key "f") and constraints (keys "g", "h", and "v"), see store_sparsity.
+        self.hess_sparsity = {}
+
         ## A list of the task and robot models (set during build method in the OptimizationBuilder class)
         self.models = None
 
@@ -192,10 +468,15 @@ class Optimization:
         f = cs.sum1(cost_terms.vec())
 
         ## CasADi function that evaluates the objective function.
-        self.f = cs.Function("f", [self.x, self.p], [f])
+        self.f = self._function("f", [self.x, self.p], [f])
 
         # Derive jocobian/hessian of objective function
-        df, ddf = derive_jacobian_and_hessian_functions("f", self.f, self.x, self.p)
+        if self.quadratic_cost:
+            df, ddf = None, None  # set when specify_quadratic_cost is called
+        else:
+            df, ddf = derive_gradient_and_hessian_functions(
+                "f", self.f, self.x, self.p, self.function_options, self.derive_hessians
+            )
 
         ## Jacobian of the objective function.
         self.df = df
@@ -203,12 +484,107 @@ class Optimization:
         ## Hessian of the objective function.
         self.ddf = ddf
 
+        if not self.quadratic_cost:
+            self.store_sparsity("f", self.df, self.ddf)
+
         ## Number of decision variables.
         self.nx = decision_variables.numel()
 
         ## Number of parameters.
         self.np = parameters.numel()
 
+    def _function(
+        self, name: str, inputs: List[CasADiArrayType], outputs: List[CasADiArrayType]
+    ) -> cs.Function:
+        """! Create a CasADi function using the function options given to the optimization problem.
+
+        @param name The function name.
+        @param inputs The symbolic inputs of the function.
+        @param outputs The symbolic outputs of the function.
+        @return The CasADi function.
+        """
+        return create_function(name, inputs, outputs, self.function_options)
+
+    def store_sparsity(
+        self, name: str, jac: cs.Function, hes: Union[None, cs.Function] = None
+    ) -> None:
+        """! Store the sparsity patterns of the Jacobian and Hessian of a function, these are given by the output of the CasADi functions and so are known without evaluating them.
+
+        @param name The function name.
+        @param jac The CasADi function that evaluates the Jacobian.
+        @param hes The CasADi function that evaluates the Hessian. When None, only the Jacobian sparsity is stored. Default is None.
+        """
+        self.jac_sparsity[name] = jac.sparsity_out(0)
+        if hes is not None:
+            self.hess_sparsity[name] = hes.sparsity_out(0)
+
+    def get_buffer(self, name: str) -> FunctionBuffer:
+        """! Return a buffer that evaluates a function of the optimization problem using preallocated arrays, i.e. repeated evaluations (e.g. inside a solver loop) do not allocate new arrays.
+
+        @param name Name of the function attribute, e.g. "f", "df", or "v".
+        @return The function buffer.
+        """
+        if name not in self._buffers:
+            self._buffers[name] = FunctionBuffer(getattr(self, name))
+        return self._buffers[name]
+
+    def get_jacobian_transpose_times(self, name: str) -> cs.Function:
+        """! Return a function that evaluates the product of the transposed Jacobian of a constraint function with a vector, e.g. dg(x, p)'.v. The function is derived when it is first requested.
+
+        @param name Name of the function attribute, i.e. "g", "h", or "v".
+        @return A CasADi function with inputs x, p, and v, see derive_jacobian_transpose_times_function.
+        """
+        if name not in self._transpose_times:
+            fun = getattr(self, name)
+            assert fun is not None, f"function {name} has not been specified"
+            self._transpose_times[name] = derive_jacobian_transpose_times_function(
+                name, fun, self.x, self.p, self.function_options
+            )
+        return self._transpose_times[name]
+
+    def batch_evaluate(
+        self,
+        name: str,
+        x: ArrayType,
+        p: Union[None, ArrayType] = None,
+        parallelization: str = "serial",
+        n_threads: Union[None, int] = None,
+    ) -> List[cs.np.ndarray]:
+        """! Evaluate a function of the optimization problem for a batch of decision variables.
+
+        The function is mapped over the batch using Function.map, i.e. the batch is evaluated in a single call. The mapped function is cached for each batch size. Only functions with inputs (x, p) are supported, i.e. not P, M, or the functions returned by get_jacobian_transpose_times.
+
+        @param name Name of the function attribute, e.g. "f", "df", or "v".
+        @param x Decision variables with shape nx-by-K, where K is the batch size.
+        @param p Parameters with shape np-by-K or np-by-1 (in the latter case the parameters are used for the entire batch). Can only be None when the problem has no parameters. Default is None.
+        @param parallelization Evaluation strategy for the mapped function, either "serial", "unroll", "openmp", or "thread". Default is "serial".
+        @param n_threads Number of threads used when parallelization is "thread", if None then the number of CPUs is used. Default is None.
+        @return List of outputs, the output for each element in the batch are concatenated horizontally.
+        """
+        if p is None:
+            assert self.np == 0, "p is required when the problem has parameters"
+            p = cs.DM.zeros(0, 1)
+        x = cs.DM(x)
+        p = cs.DM(p)
+        batch_size = x.shape[1]
+
+        key = (name, batch_size, parallelization, n_threads)
+        if key not in self._batched_functions:
+            fun = getattr(self, name)
+            if parallelization == "thread":
+                n_threads = os.cpu_count() if n_threads is None else n_threads
+                self._batched_functions[key] = fun.map(
+                    batch_size, parallelization, n_threads
+                )
+            else:
+                self._batched_functions[key] = fun.map(batch_size, parallelization)
+
+        if p.shape[1] == 1:
+            p = cs.repmat(p, 1, batch_size)
+
+        out = self._batched_functions[key].call([x, p])
+        return [o.toarray() for o in out]
+
     def set_models(self, models: List[Model]) -> None:
         """! Specify the models in the optimization problem.
 
@@ -217,10 +593,23 @@ class Optimization:
         self.models = models
 
     def specify_quadratic_cost(self) -> None:
-        """! Specify the terms P and q of a quadratic cost function."""
-        x_zero = cs.DM.zeros(self.nx)
-        self.P = cs.Function("P", [self.p], [0.5 * self.ddf(self.x, self.p)])
-        self.q = cs.Function("q", [self.p], [cs.vec(self.df(x_zero, self.p))])
+        """! Specify the terms P and q of a quadratic cost function, and the Jacobian/Hessian of the cost function given by
+
+            df(x, p) = (2.P(p).x + q(p))'
+            ddf(x, p) = 2.P(p)
+
+        The Hessian and gradient are derived once, rather than differentiating the cost function twice.
+        """
+        x_zero = cs.DM.zeros(self.nx)  # the Hessian is independent of x
+        hes, grad = cs.hessian(self.f(self.x, self.p), self.x)
+        hes_grad = cs.Function("hes_grad", [self.x, self.p], [hes, grad])
+        H, q = hes_grad(x_zero, self.p)  # q is the gradient at x = 0
+
+        self.P = self._function("P", [self.p], [0.5 * H])
+        self.q = self._function("q", [self.p], [q])
+        self.df = self._function("df", [self.x, self.p], [(cs.mtimes(H, self.x) + q).T])
+        self.ddf = self._function("ddf", [self.x, self.p], [H])
+        self.store_sparsity("f", self.df, self.ddf)
 
     def specify_linear_constraints(
         self, lin_ineq_constraints, lin_eq_constraints
@@ -235,29 +624,36 @@ class Optimization:
         self.lin_eq_constraints = lin_eq_constraints
 
         # Setup k
-        self.k = cs.Function("k", [self.x, self.p], [self.lin_ineq_constraints.vec()])
+        self.k = self._function(
+            "k", [self.x, self.p], [self.lin_ineq_constraints.vec()]
+        )
         self.nk = self.lin_ineq_constraints.numel()
         self.lbk = cs.DM.zeros(self.nk)
         self.ubk = self.inf * cs.DM.ones(self.nk)
 
-        # Setup M and c
+        # Setup M and c (the Jacobian of k is independent of x)
         x_zero = cs.DM.zeros(self.nx)
-        self.M = cs.Function(
-            "M", [self.p], [cs.jacobian(self.k(self.x, self.p), self.x)]
+        dk = cs.Function(
+            "dk", [self.x, self.p], [cs.jacobian(self.k(self.x, self.p), self.x)]
         )
-        self.c = cs.Function("c", [self.p], [self.k(x_zero, self.p)])
+        self.M = self._function("M", [self.p], [dk(x_zero, self.p)])
+        self.c = self._function("c", [self.p], [self.k(x_zero, self.p)])
 
         # Setup a
-        self.a = cs.Function("a", [self.x, self.p], [self.lin_eq_constraints.vec()])
+        self.a = self._function("a", [self.x, self.p], [self.lin_eq_constraints.vec()])
         self.na = self.lin_eq_constraints.numel()
         self.lba = cs.DM.zeros(self.na)
         self.uba = cs.DM.zeros(self.na)
 
-        # Setup A and b
-        self.A = cs.Function(
-            "A", [self.p], [cs.jacobian(self.a(self.x, self.p), self.x)]
+        # Setup A and b (the Jacobian of a is independent of x)
+        da = cs.Function(
+            "da", [self.x, self.p], [cs.jacobian(self.a(self.x, self.p), self.x)]
         )
-        self.b = cs.Function("b", [self.p], [self.a(x_zero, self.p)])
+        self.A = self._function("A", [self.p], [da(x_zero, self.p)])
+        self.b = self._function("b", [self.p], [self.a(x_zero, self.p)])
+
+        self.store_sparsity("k", self.M)
+        self.store_sparsity("a", self.A)
 
     def specify_nonlinear_constraints(
         self, ineq_constraints: SXContainer, eq_constraints: SXContainer
@@ -272,22 +668,24 @@ class Optimization:
         self.eq_constraints = eq_constraints
 
         # Setup g
-        self.g = cs.Function("g", [self.x, self.p], [self.ineq_constraints.vec()])
+        self.g = self._function("g", [self.x, self.p], [self.ineq_constraints.vec()])
         self.ng = self.ineq_constraints.numel()
         self.lbg = cs.DM.zeros(self.ng)
         self.ubg = self.inf * cs.DM.ones(self.ng)
         self.dg, self.ddg = derive_jacobian_and_hessian_functions(
-            "g", self.g, self.x, self.p
+            "g", self.g, self.x, self.p, self.function_options, self.derive_hessians
         )
+        self.store_sparsity("g", self.dg, self.ddg)
 
         # Setup h
-        self.h = cs.Function("g", [self.x, self.p], [self.eq_constraints.vec()])
+        self.h = self._function("g", [self.x, self.p], [self.eq_constraints.vec()])
         self.nh = self.eq_constraints.numel()
         self.lbh = cs.DM.zeros(self.nh)
         self.ubh = cs.DM.zeros(self.nh)
         self.dh, self.ddh = derive_jacobian_and_hessian_functions(
-            "h", self.h, self.x, self.p
+            "h", self.h, self.x, self.p, self.function_options, self.derive_hessians
         )
+        self.store_sparsity("h", self.dh, self.ddh)
 
     def specify_v(
         self, ineq: List[cs.Function] = [], eq: List[cs.Function] = []
@@ -297,13 +695,19 @@ class Optimization:
         @param ineq List of CasADi functions that evalaute the (non)linear inequality constraints.
         @param ineq List of CasADi functions that evalaute the (non)linear equality constraints.
         """
-        self.v = vertcon(self.x, self.p, ineq=ineq, eq=eq)
+        self.v = vertcon(self.x, self.p, ineq=ineq, eq=eq, opts=self.function_options)
         self.nv = self.v.numel_out()
         self.lbv = cs.DM.zeros(self.nv)
         self.ubv = self.inf * cs.DM.ones(self.nv)
-        self.dv, self.ddv = derive_jacobian_and_hessian_functions(
-            "v", self.v, self.x, self.p
+        if (self.g is None) and (self.h is None):
+            # Only linear constraints, i.e. the Hessian of v is zero
+            derive = derive_linear_jacobian_and_hessian_functions
+        else:
+            derive = derive_jacobian_and_hessian_functions
+        self.dv, self.ddv = derive(
+            "v", self.v, self.x, self.p, self.function_options, self.derive_hessians
         )
+        self.store_sparsity("v", self.dv, self.ddv)
 
     def has_discrete_variables(self):
         return self.decision_variables.has_discrete_variables()
@@ -318,20 +722,24 @@ class QuadraticCostUnconstrained(Optimization):
     The problem is unconstrained, and has quadratic cost function.
     """
 
+    quadratic_cost = True
+
     def __init__(
         self,
         decision_variables: SXContainer,  # SXContainer for decision variables
         parameters: SXContainer,  # SXContainer for parameters
         cost_terms: SXContainer,  # SXContainer for cost terms
+        **kwargs,
     ):
         """! Initializer for the QuadraticCostUnconstrained class.
 
         @param decision_variables SXContainer containing decision variables.
         @param parameters SXContainer containing parameters.
         @param cost_terms SXContainer containing cost terms (must be quadratic).
+        @param kwargs Keyword arguments passed to the Optimization class.
         @return Instance of the QuadraticCostUnconstrained class.
         """
-        super().__init__(decision_variables, parameters, cost_terms)
+        super().__init__(decision_variables, parameters, cost_terms, **kwargs)
         self.specify_quadratic_cost()
 
 
@@ -349,6 +757,8 @@ class QuadraticCostLinearConstraints(Optimization):
     quadratic cost function.
     """
 
+    quadratic_cost = True
+
     def __init__(
         self,
         decision_variables: SXContainer,  # SXContainer for decision variables
@@ -356,6 +766,7 @@ class QuadraticCostLinearConstraints(Optimization):
         cost_terms: SXContainer,  # SXContainer for cost terms
         lin_eq_constraints: SXContainer,  # SXContainer for linear equality constraints
         lin_ineq_constraints: SXContainer,  # SXContainer for linear inequality constraints
+        **kwargs,
     ):
         """! Initializer for the QuadraticCostLinearConstraints class.
 
@@ -364,9 +775,10 @@ class QuadraticCostLinearConstraints(Optimization):
         @param cost_terms SXContainer containing cost terms (must be quadratic).
         @param lin_eq_constraints SXContainer containing the linear equality constraints.
         @param lin_ineq_constraints SXContainer containing the linear inequality constraints.
+        @param kwargs Keyword arguments passed to the Optimization class.
         @return Instance of the QuadraticCostLinearConstraints class.
         """
-        super().__init__(decision_variables, parameters, cost_terms)
+        super().__init__(decision_variables, parameters, cost_terms, **kwargs)
         self.specify_quadratic_cost()
         self.specify_linear_constraints(lin_ineq_constraints, lin_eq_constraints)
         self.specify_v(ineq=[self.k], eq=[self.a])
@@ -390,6 +802,8 @@ class QuadraticCostNonlinearConstraints(Optimization):
 
     """
 
+    quadratic_cost = True
+
     def __init__(
         self,
         decision_variables: SXContainer,  # SXContainer for decision variables
@@ -399,6 +813,7 @@ class QuadraticCostNonlinearConstraints(Optimization):
         lin_ineq_constraints: SXContainer,  # SXContainer for linear inequality constraints
         eq_constraints: SXContainer,  # SXContainer for equality constraints
         ineq_constraints: SXContainer,  # SXContainer for inequality constraints
+        **kwargs,
     ):
         """! Initializer for the QuadraticCostNonlinearConstraints class.
 
@@ -409,9 +824,10 @@ class QuadraticCostNonlinearConstraints(Optimization):
         @param lin_ineq_constraints SXContainer containing the linear inequality constraints.
         @param eq_constraints SXContainer containing the equality constraints.
         @param ineq_constraints SXContainer containing the inequality constraints.
+        @param kwargs Keyword arguments passed to the Optimization class.
         @return Instance of the QuadraticCostNonlinearConstraints class.
         """
-        super().__init__(decision_variables, parameters, cost_terms)
+        super().__init__(decision_variables, parameters, cost_terms, **kwargs)
         self.specify_quadratic_cost()
         self.specify_linear_constraints(lin_ineq_constraints, lin_eq_constraints)
         self.specify_nonlinear_constraints(ineq_constraints, eq_constraints)
@@ -433,15 +849,17 @@ class NonlinearCostUnconstrained(Optimization):
         decision_variables: SXContainer,
         parameters: SXContainer,
         cost_terms: SXContainer,
+        **kwargs,
     ):
         """! Initializer for the NonlinearCostUnconstrained class.
 
         @param decision_variables SXContainer containing decision variables.
         @param parameters SXContainer containing parameters.
         @param cost_terms SXContainer containing cost terms.
+        @param kwargs Keyword arguments passed to the Optimization class.
         @return Instance of the NonlinearCostUnconstrained class.
         """
-        super().__init__(decision_variables, parameters, cost_terms)
+        super().__init__(decision_variables, parameters, cost_terms, **kwargs)
 
 
 class NonlinearCostLinearConstraints(Optimization):
@@ -471,6 +889,7 @@ class NonlinearCostLinearConstraints(Optimization):
         cost_terms: SXContainer,  # SXContainer for cost terms
         lin_eq_constraints: SXContainer,  # SXContainer for linear equality constraints
         lin_ineq_constraints: SXContainer,  # SXContainer for linear inequality constraints
+        **kwargs,
     ):
         """! Initializer for the NonlinearCostLinearConstraints class.
 
@@ -479,9 +898,10 @@ class NonlinearCostLinearConstraints(Optimization):
         @param cost_terms SXContainer containing cost terms.
         @param lin_eq_constraints SXContainer containing the linear equality constraints.
         @param lin_ineq_constraints SXContainer containing the linear inequality constraints.
+        @param kwargs Keyword arguments passed to the Optimization class.
         @return Instance of the NonlinearCostLinearConstraints class.
         """
-        super().__init__(decision_variables, parameters, cost_terms)
+        super().__init__(decision_variables, parameters, cost_terms, **kwargs)
         self.specify_linear_constraints(lin_ineq_constraints, lin_eq_constraints)
         self.specify_v(ineq=[self.k], eq=[self.a])
 
@@ -512,6 +932,7 @@ class NonlinearCostNonlinearConstraints(Optimization):
         lin_ineq_constraints: SXContainer,  # SXContainer for linear inequality constraints
         eq_constraints: SXContainer,  # SXContainer for equality constraints
         ineq_constraints: SXContainer,  # SXContainer for inequality constraints
+        **kwargs,
     ):
         """! Initializer for the NonlinearCostNonlinearConstraints class.
 
@@ -522,9 +943,10 @@ class NonlinearCostNonlinearConstraints(Optimization):
         @param lin_ineq_constraints SXContainer containing the linear inequality constraints.
         @param eq_constraints SXContainer containing the equality constraints.
         @param ineq_constraints SXContainer containing the inequality constraints.
+        @param kwargs Keyword arguments passed to the Optimization class.
         @return Instance of the NonlinearCostNonlinearConstraints class.
         """
-        super().__init__(decision_variables, parameters, cost_terms)
+        super().__init__(decision_variables, parameters, cost_terms, **kwargs)
         self.specify_linear_constraints(lin_ineq_constraints, lin_eq_constraints)
         self.specify_nonlinear_constraints(ineq_constraints, eq_constraints)
         self.specify_v(ineq=[self.k, self.g], eq=[self.a, self.h])
@@ -553,6 +975,7 @@ class MixedIntegerNonlinearCostNonlinearConstrained(NonlinearCostNonlinearConstr
         lin_ineq_constraints: SXContainer,  # SXContainer for linear inequality constraints
         eq_constraints: SXContainer,  # SXContainer for equality constraints
         ineq_constraints: SXContainer,  # SXContainer for inequality constraints
+        **kwargs,
     ):
         """! Initializer for the MixedIntegerNonlinearCostNonlinearConstrained class.
 
@@ -563,6 +986,16 @@ class MixedIntegerNonlinearCostNonlinearConstrained(NonlinearCostNonlinearConstr
         @param lin_ineq_constraints SXContainer containing the linear inequality constraints.
         @param eq_constraints SXContainer containing the equality constraints.
         @param ineq_constraints SXContainer containing the inequality constraints.
+        @param kwargs Keyword arguments passed to the Optimization class.
         @return Instance of the MixedIntegerNonlinearCostNonlinearConstrained class.
         """
-        super().__init__(decision_variables, parameters, cost_terms, lin_eq_constraints,  lin_ineq_constraints, eq_constraints, ineq_constraints)
+        super().__init__(
+            decision_variables,
+            parameters,
+            cost_terms,
+            lin_eq_constraints,
+            lin_ineq_constraints,
+            eq_constraints,
+            ineq_constraints,
+            **kwargs,
+        )
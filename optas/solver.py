@@ -5,7 +5,7 @@ import casadi as cs
 from dataclasses import dataclass
 from abc import ABC, abstractmethod
 from scipy.interpolate import interp1d
-from scipy.optimize import minimize, NonlinearConstraint, LinearConstraint
+from scipy.optimize import minimize, NonlinearConstraint, LinearConstraint, BFGS
 from scipy.sparse import csc_matrix
 from .optimization import (
     Optimization,
@@ -16,6 +16,7 @@ from .optimization import (
     NonlinearCostLinearConstraints,
     NonlinearCostNonlinearConstraints,
     MixedIntegerNonlinearCostNonlinearConstrained,
+    derive_fused_function,
 )
 from .models import RobotModel
 from .spatialmath import ArrayType, CasADiArrayType
@@ -372,6 +373,9 @@ class CasADiSolver(Solver):
                 f"solver '{solver_name}' does not support this problem type"
             )
 
+        # Merge default solver options
+        solver_options = {**self.opt.solver_options, **solver_options}
+
         # Check for discrete variables
         if self.opt.has_discrete_variables():
             solver_options["discrete"] = self.opt.decision_variables.discrete()
@@ -437,8 +441,21 @@ class OSQPSolver(Solver):
         assert self.opt_type in QP_COST, "OSQP cannot solve this type of problem"
         self.use_warm_start = use_warm_start
         self._setup_input = settings
+
+        ## Compressed column structure of P (the sparsity is given by the Hessian of the cost function).
+        self._P_ccs = self._ccs(self.opt.hess_sparsity["f"])
+
         if self.opt_type in CONSTRAINED_OPT:
             self._setup_input["u"] = np.inf * np.ones(self.opt.nk + self.opt.na)
+
+            ## Compressed column structure of the stacked constraint matrix [M; A; -A].
+            self._A_ccs = self._ccs(
+                cs.vertcat(
+                    self.opt.jac_sparsity["k"],
+                    self.opt.jac_sparsity["a"],
+                    self.opt.jac_sparsity["a"],
+                )
+            )
         self._reset_parameters()
         return self
 
@@ -450,17 +467,29 @@ class OSQPSolver(Solver):
         super().reset_parameters(p)
         self._reset_parameters()
 
+    @staticmethod
+    def _ccs(sparsity: cs.Sparsity) -> Tuple:
+        """! Internal method that returns the compressed column structure of a sparsity pattern, i.e. (row indices, column offsets, shape)."""
+        colind, row = sparsity.get_ccs()
+        return np.array(row), np.array(colind), sparsity.shape
+
+    @staticmethod
+    def _csc(nonzeros: List[float], ccs: Tuple) -> csc_matrix:
+        """! Internal method that returns a sparse matrix given its nonzeros and compressed column structure."""
+        row, colind, shape = ccs
+        return csc_matrix((nonzeros, row, colind), shape=shape)
+
     def _reset_parameters(self) -> None:
         """! Internal method to reset parameters."""
         self._setup_input = {
-            "P": csc_matrix(2.0 * self.opt.P(self.p).toarray()),
+            "P": self._csc(2.0 * np.array(self.opt.P(self.p).nonzeros()), self._P_ccs),
             "q": self.opt.q(self.p).toarray().flatten(),
         }
         if self.opt_type in CONSTRAINED_OPT:
             A = self.opt.A(self.p)
             b = self.opt.b(self.p)
-            self._setup_input["A"] = csc_matrix(
-                cs.vertcat(self.opt.M(self.p), A, -A).toarray()
+            self._setup_input["A"] = self._csc(
+                cs.vertcat(self.opt.M(self.p), A, -A).nonzeros(), self._A_ccs
             )
             self._setup_input["l"] = (
                 cs.vertcat(-self.opt.c(self.p), -b, b).toarray().flatten()
@@ -646,6 +675,18 @@ class ScipyMinimizeSolver(Solver):
         ## Method name.
         self.method = method
 
+        ## Fused function that evaluates the nonlinear constraints and their Jacobians, i.e. (g, h, dg, dh), derived when the constraints are first evaluated. See derive_fused_function.
+        self._gh_fun = None
+
+        ## Decision variables at which the fused constraint function was last evaluated.
+        self._gh_x = None
+
+        ## Output of the fused constraint function at self._gh_x, i.e. (g, h, dg, dh).
+        self._gh_out = None
+
+        ## Parameter vector as a numpy array, passed to the function buffers (see Optimization.get_buffer).
+        self._p_np = self.p.toarray().flatten()
+
         # Setup minimize input parameters
 
         ## Input to the minimize method
@@ -664,7 +705,7 @@ class ScipyMinimizeSolver(Solver):
         if method in ScipyMinimizeSolver.methods_req_jac:
             self.minimize_input["jac"] = self.jac
 
-        if method in ScipyMinimizeSolver.methods_req_hess:
+        if method in ScipyMinimizeSolver.methods_req_hess and self.opt.ddf is not None:
             self.minimize_input["hess"] = self.hess
 
         ## Constraints definition passed to the minimize method.
@@ -699,7 +740,7 @@ class ScipyMinimizeSolver(Solver):
                         lb=np.zeros(self.opt.ng),
                         ub=self.opt.inf * np.ones(self.opt.ng),
                         jac=self.dg,
-                        hess=self.ddg,
+                        hess=BFGS() if self.opt.ddg is None else self.ddg,
                     )
 
                 if self.opt.nh:
@@ -708,38 +749,53 @@ class ScipyMinimizeSolver(Solver):
                         lb=np.zeros(self.opt.nh),
                         ub=np.zeros(self.opt.nh),
                         jac=self.dh,
-                        hess=self.ddh,
+                        hess=BFGS() if self.opt.ddh is None else self.ddh,
                     )
 
         return self
 
     def f(self, x: cs.np.ndarray) -> cs.np.ndarray:
         """! Internal method."""
-        return float(self.opt.f(x, self.p).toarray().flatten()[0])
+        return float(self.opt.get_buffer("f")(x, self._p_np)[0][0, 0])
 
     def jac(self, x: cs.np.ndarray) -> cs.np.ndarray:
         """! Internal method."""
-        return self.opt.df(x, self.p).toarray().flatten()
+        return self.opt.get_buffer("df")(x, self._p_np)[0].flatten()
 
     def hess(self, x: cs.np.ndarray) -> cs.np.ndarray:
         """! Internal method."""
-        return self.opt.ddf(x, self.p).toarray()
+        return self.opt.get_buffer("ddf")(x, self._p_np)[0].copy()
 
     def v(self, x: cs.np.ndarray) -> cs.np.ndarray:
         """! Internal method."""
-        return self.opt.v(x, self.p).toarray().flatten()
+        return self.opt.get_buffer("v")(x, self._p_np)[0].flatten()
 
     def dv(self, x: cs.np.ndarray) -> cs.np.ndarray:
         """! Internal method."""
-        return self.opt.dv(x, self.p).toarray()
+        return self.opt.get_buffer("dv")(x, self._p_np)[0].copy()
+
+    def _gh(self, x: cs.np.ndarray) -> Tuple[cs.DM]:
+        """! Internal method. Evaluates the nonlinear constraints and their Jacobians in a single call, re-evaluating only when x changes."""
+        if self._gh_fun is None:
+            self._gh_fun = derive_fused_function(
+                "gh",
+                [self.opt.ineq_constraints.vec(), self.opt.eq_constraints.vec()],
+                self.opt.x,
+                self.opt.p,
+                self.opt.function_options,
+            )
+        if (self._gh_x is None) or not np.array_equal(x, self._gh_x):
+            self._gh_out = self._gh_fun(x, self.p)
+            self._gh_x = np.array(x, copy=True)
+        return self._gh_out
 
     def g(self, x: cs.np.ndarray) -> cs.np.ndarray:
         """! Internal method."""
-        return self.opt.g(x, self.p).toarray().flatten()
+        return self._gh(x)[0].toarray().flatten()
 
     def dg(self, x: cs.np.ndarray) -> cs.np.ndarray:
         """! Internal method."""
-        return self.opt.dg(x, self.p).toarray()
+        return self._gh(x)[2].toarray()
 
     def ddg(self, x: cs.np.ndarray) -> cs.np.ndarray:
         """! Internal method."""
@@ -747,11 +803,11 @@ class ScipyMinimizeSolver(Solver):
 
     def h(self, x: cs.np.ndarray) -> cs.np.ndarray:
         """! Internal method."""
-        return self.opt.h(x, self.p).toarray().flatten()
+        return self._gh(x)[1].toarray().flatten()
 
     def dh(self, x: cs.np.ndarray) -> cs.np.ndarray:
         """! Internal method."""
-        return self.opt.dh(x, self.p).toarray()
+        return self._gh(x)[3].toarray()
 
     def ddh(self, x: cs.np.ndarray) -> cs.np.ndarray:
         """! Internal method."""
@@ -771,6 +827,8 @@ class ScipyMinimizeSolver(Solver):
         @param p The values for the parameters.
         """
         super().reset_parameters(p)
+        self._gh_x = None
+        self._p_np = self.p.toarray().flatten()
         if self.method == "trust-constr":
             if self.opt.nk:
                 self._constraints["k"].A = csc_matrix(self.opt.M(self.p).toarray())
@@ -11,16 +11,22 @@ from .spatialmath import ArrayType
 ## SX type: https://web.casadi.org/docs/#document-symbolic
 SX = cs.casadi.SX
 
+## MX type: https://web.casadi.org/docs/#document-symbolic
+MX = cs.casadi.MX
+
 ## DM type: https://web.casadi.org/docs/#dm
 DM = cs.casadi.DM
 
 
 class SXContainer(collections.OrderedDict):
-    """! Container for SX variables"""
+    """! Container for SX variables (MX variables are also supported)"""
 
     ## Dict[str, bool]: labels for each item in dict, true means variables are discrete
     is_discrete = {}
 
+    ## Vectorized form of the container, this is reset when items are set (see vec).
+    _vec_cache = None
+
     def __add__(self, other):
         """! Add two SXContainer's.
 
@@ -38,22 +44,48 @@ class SXContainer(collections.OrderedDict):
         out.is_discrete = {**self.is_discrete, **other.is_discrete}
         return out
 
-    def __setitem__(self, label: str, value: SX) -> None:
-        """! Set new SX item.
+    def __setitem__(self, label: str, value: Union[SX, MX]) -> None:
+        """! Set new SX/MX item.
 
         @param label Name for the new item.
         @param value An array containing symbolic data.
         """
         assert isinstance(
-            value, (SX, float)
-        ), f"value must be of type casadi.casadi.SX/float, not {type(value)}"
+            value, (SX, MX, float)
+        ), f"value must be of type casadi.casadi.SX/MX/float, not {type(value)}"
         if label in self:
             raise KeyError(f"'{label}' already exists")
-        super().__setitem__(label, cs.SX(value))
+        if not isinstance(value, MX):
+            value = cs.SX(value)
+        super().__setitem__(label, value)
+        self._vec_cache = None
         self.is_discrete[
             label
         ] = False  # assume non-discrete, otherwise variable_is_discrete(..) should be called
 
+    def __delitem__(self, label: str) -> None:
+        """! Delete item.
+
+        @param label Name for the item.
+        """
+        super().__delitem__(label)
+        self._vec_cache = None
+
+    def pop(self, *args):
+        """! Remove an item and return its value, see collections.OrderedDict.pop."""
+        self._vec_cache = None
+        return super().pop(*args)
+
+    def popitem(self, last: bool = True):
+        """! Remove and return an item (label, value), see collections.OrderedDict.popitem."""
+        self._vec_cache = None
+        return super().popitem(last)
+
+    def clear(self) -> None:
+        """! Remove all items."""
+        self._vec_cache = None
+        super().clear()
+
     def variable_is_discrete(self, label: str) -> None:
         """! Specify that a given variable is discrete.
 
@@ -80,13 +112,15 @@ class SXContainer(collections.OrderedDict):
             out += [self.is_discrete[label]] * (m * n)
         return out
 
-    def vec(self) -> SX:
+    def vec(self) -> Union[SX, MX]:
         """! Vectorize SXContainer.
 
         @return Array containing the vectorized form for the instance.
         """
-        values = list(cs.vec(value) for value in self.values())
-        return cs.vertcat(*values)
+        if self._vec_cache is None:
+            values = list(cs.vec(value) for value in self.values())
+            self._vec_cache = cs.vertcat(*values)
+        return self._vec_cache
 
     def numel(self) -> int:
         """! Return the number of elements.
@@ -110,7 +144,7 @@ class SXContainer(collections.OrderedDict):
             vec = vec[mn:]
         return out_dict
 
-    def dict2vec(self, d: Dict[str, ArrayType]) -> Union[DM, SX]:
+    def dict2vec(self, d: Dict[str, ArrayType]) -> Union[DM, SX, MX]:
         """! Vectorize dictionary with same layout as container.
 
         @param d Dictionary containing values to be vectorized.
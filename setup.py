@@ -20,7 +20,7 @@ setup(
     install_requires=[
         "numpy",
         "scipy",
-        "casadi",
+        "casadi>=3.6",
         "urdf-parser-py",
         "osqp",
         "cvxopt",
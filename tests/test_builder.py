@@ -1,6 +1,8 @@
+import gc
 import os
 import optas
 import pytest
+import shutil
 import pathlib
 
 
@@ -36,6 +38,34 @@ class Test_OptimizationBuilder:
             sx_container = getattr(builder, label)
             assert sx_container.numel() == expected_numel
 
+    def test_init_model_states_single_symbol(self):
+        T = 4
+        task_model = optas.TaskModel("test", 2, time_derivs=[0, 1])
+        builder = optas.OptimizationBuilder(T, tasks=task_model)
+
+        # The decision variables are the elements of a single 2-by-(2T - 1)
+        # symbol, in the same order as the vectorized per-derivative states
+        x = builder._x()
+        assert x.is_valid_input()
+        assert [x.nz[i].name() for i in range(x.numel())] == [
+            f"test_{i}" for i in range(2 * (2 * T - 1))
+        ]
+        assert optas.is_equal(
+            x,
+            optas.vertcat(
+                optas.vec(builder.get_model_states("test", 0)),
+                optas.vec(builder.get_model_states("test", 1)),
+            ),
+        )
+
+        # The states for each time derivative are column slices
+        for time_deriv, offset in [(0, 0), (1, T)]:
+            states = builder.get_model_states("test", time_deriv)
+            assert states.shape == (2, T - time_deriv)
+            for i in range(2):
+                for j in range(T - time_deriv):
+                    assert states[i, j].name() == f"test_{2 * (offset + j) + i}"
+
     def test_get_model_names(self):
         T = 10
         task_model_1 = optas.TaskModel("test1", 3)
@@ -189,6 +219,10 @@ class Test_OptimizationBuilder:
         assert isinstance(x, optas.SX)
         assert optas.vec(x).shape[0] == 30
 
+        builder.add_decision_variables("y", 2)
+        x = builder._x()
+        assert optas.vec(x).shape[0] == 32
+
     def test_p(self):
         cwd = pathlib.Path(
             __file__
@@ -214,6 +248,29 @@ class Test_OptimizationBuilder:
         y = 2.0 * x
         assert builder._is_linear_in_x(y) == True
 
+    @pytest.mark.parametrize("expression_type", ["SX", "MX"])
+    def test_likely_nonlinear(self, expression_type):
+        T = 10
+        task_model = optas.TaskModel("test", 3)
+        builder = optas.OptimizationBuilder(
+            T, tasks=task_model, expression_type=expression_type
+        )
+        x = builder.get_model_state("test", 0)
+        p = builder.add_parameter("p", 3)
+
+        for y in [optas.sin(x), x * x, 1.0 / x, x[0] * x[1]]:
+            assert builder._likely_nonlinear(y)
+            assert builder._is_linear_in_x(y) == False
+
+        # Undetermined by the top-level operation, falls back to the full check
+        y = optas.sin(x[0]) + x[1]
+        assert not builder._likely_nonlinear(y)
+        assert builder._is_linear_in_x(y) == False
+
+        for y in [2.0 * x - 1.0, p * x, x / p, optas.sin(p) + x]:
+            assert not builder._likely_nonlinear(y)
+            assert builder._is_linear_in_x(y) == True
+
     def test_cost(self):
         T = 10
         task_model = optas.TaskModel("test", 3)
@@ -242,6 +299,57 @@ class Test_OptimizationBuilder:
 
         assert builder.is_cost_quadratic() == False
 
+    @pytest.mark.parametrize("expression_type", ["SX", "MX"])
+    @pytest.mark.parametrize("parallelization", ["serial", "thread"])
+    def test_add_stage_cost(self, expression_type, parallelization):
+        T = 10
+        task_model = optas.TaskModel("test", 3)
+        builder = optas.OptimizationBuilder(
+            T, tasks=task_model, expression_type=expression_type
+        )
+        states = builder.get_model_states("test")
+        goal = builder.add_parameter("goal", 3)
+        builder.add_stage_cost(
+            "test_cost",
+            lambda x, g: optas.cos(optas.sumsqr(x - g)),
+            "test",
+            args=[goal],
+            parallelization=parallelization,
+            n_threads=2,
+        )
+        known = sum(optas.cos(optas.sumsqr(states[:, t] - goal)) for t in range(T))
+        fun = optas.Function("fun", [builder._x(), builder._p()], [builder._cost()])
+        fun_known = optas.Function("fun_known", [builder._x(), builder._p()], [known])
+
+        assert builder._cost().shape == (1, 1)
+        x = optas.np.random.uniform(-1, 1, size=(3 * T,))
+        p = optas.np.random.uniform(-1, 1, size=(3,))
+        assert optas.np.isclose(float(fun(x, p)), float(fun_known(x, p)))
+
+    @pytest.mark.parametrize("expression_type", ["SX", "MX"])
+    def test_add_stage_cost_quadratic(self, expression_type):
+        T = 10
+        task_model = optas.TaskModel("test", 3)
+        builder = optas.OptimizationBuilder(
+            T, tasks=task_model, expression_type=expression_type
+        )
+        states = builder.get_model_states("test")
+        goal = builder.add_parameter("goal", 3)
+        builder.add_stage_cost(
+            "test_cost", lambda x, g: optas.sumsqr(x - g), "test", args=[goal]
+        )
+        builder.add_bound_inequality_constraint("bounds", -1.0, states, 1.0)
+
+        assert builder.is_cost_quadratic() == True
+        opt = builder.build()
+        assert isinstance(opt, optas.optimization.QuadraticCostLinearConstraints)
+
+        solver = optas.OSQPSolver(opt).setup(use_warm_start=False)
+        solver.reset_parameters({"goal": [0.5, 2.0, -2.0]})
+        solution = solver.solve()
+        known = optas.np.tile([[0.5], [1.0], [-1.0]], (1, T))
+        assert optas.np.allclose(solution["test/y"].toarray(), known, atol=1e-3)
+
     # methods: add_decision_variables, add_parameters, and
     # add_cost_term already tested in methods above.
 
@@ -284,6 +392,20 @@ class Test_OptimizationBuilder:
         assert builder._lin_ineq_constraints.numel() == 2 * 30
         assert builder._ineq_constraints.numel() == 2 * 1
 
+    def test_add_stage_inequality_constraint(self):
+        T = 10
+        task_model = optas.TaskModel("test", 3)
+        builder = optas.OptimizationBuilder(T, tasks=task_model)
+        builder.add_stage_inequality_constraint(
+            "test_con1", lambda x, lo: x - lo, "test", args=[[1.0, 2.0, 3.0]]
+        )
+        builder.add_stage_inequality_constraint(
+            "test_con2", lambda x: 1.0 - optas.sumsqr(x), "test"
+        )
+
+        assert builder._lin_ineq_constraints.numel() == 30
+        assert builder._ineq_constraints.numel() == 10
+
     def test_add_equality_constraint(self):
         T = 10
         task_model = optas.TaskModel("test", 3)
@@ -297,6 +419,31 @@ class Test_OptimizationBuilder:
         assert builder._lin_eq_constraints.numel() == 30
         assert builder._eq_constraints.numel() == 1
 
+    @pytest.mark.parametrize("expression_type", ["SX", "MX"])
+    def test_add_stage_equality_constraint(self, expression_type):
+        T = 10
+        task_model = optas.TaskModel("test", 3)
+        builder = optas.OptimizationBuilder(
+            T, tasks=task_model, expression_type=expression_type
+        )
+        builder.add_stage_equality_constraint(
+            "test_con1", lambda x, c: x - c, "test", args=[[1.0, 2.0, 3.0]]
+        )
+        builder.add_stage_equality_constraint(
+            "test_con2", lambda x: optas.sumsqr(x) - 1.0, "test", n_threads=2
+        )
+
+        assert builder._eq_constraints["test_con2"].shape == (1, T)
+        assert builder._lin_eq_constraints.numel() == 30
+        assert builder._eq_constraints.numel() == 10
+
+        con = optas.Function(
+            "con", [builder._x()], [builder._eq_constraints["test_con2"]]
+        )
+        x = optas.np.random.uniform(-1, 1, size=(3, T))
+        known = 1.0 - optas.np.sum(x**2, axis=0)  # stored as rhs - lhs
+        assert optas.np.isclose(con(x.T.flatten()).toarray().flatten(), known).all()
+
     def test_integrate_model_states(self):
         T = 10
         task_model = optas.TaskModel("test", 2, time_derivs=[0, 1])
@@ -310,6 +457,27 @@ class Test_OptimizationBuilder:
         builder.integrate_model_states("test", 1, 1)
         assert builder._lin_eq_constraints.numel() == 2 * (T - 1)
 
+    @pytest.mark.parametrize("expression_type", ["SX", "MX"])
+    def test_integrate_model_states_QP(self, expression_type):
+        T = 5
+        task_model = optas.TaskModel("test", 1, time_derivs=[0, 1])
+        builder = optas.OptimizationBuilder(
+            T, tasks=task_model, derivs_align=True, expression_type=expression_type
+        )
+        X = builder.get_model_states("test")
+        dX = builder.get_model_states("test", 1)
+        builder.add_cost_term("cost", optas.sumsqr(dX - 1.0))
+        builder.add_equality_constraint("init", X[:, 0])
+        builder.integrate_model_states("test", 1, 1.0)
+        opt = builder.build()
+
+        assert isinstance(opt, optas.optimization.QuadraticCostLinearConstraints)
+        solver = optas.OSQPSolver(opt).setup(use_warm_start=False)
+        solver.reset_parameters({})
+        solution = solver.solve()
+        known = optas.np.arange(T, dtype=float).reshape(1, T)
+        assert optas.np.allclose(solution["test/y"].toarray(), known, atol=1e-3)
+
     def test_enforce_model_limits(self):
         cwd = pathlib.Path(
             __file__
@@ -417,3 +585,121 @@ class Test_OptimizationBuilder:
         builder.add_equality_constraint("test_eq_constraints", X[0] * X[1])
         opt = builder.build()
         assert isinstance(opt, optas.optimization.NonlinearCostNonlinearConstraints)
+
+    @pytest.mark.parametrize("solver_hint", [None, "ipopt", "SLSQP", "sqpmethod"])
+    def test_build_solver_hint(self, solver_hint):
+        T = 10
+        task_model = optas.TaskModel("test", 2, time_derivs=[0, 1])
+        builder = optas.OptimizationBuilder(T, tasks=task_model, derivs_align=True)
+        X = builder.get_model_states("test")
+        builder.add_cost_term("test_term1", optas.sumsqr(X))
+        builder.add_cost_term("test_term2", optas.cos(X[0] * X[1]))
+        builder.add_bound_inequality_constraint("test_limits", -100, X, 100)
+        builder.add_equality_constraint("test_eq_constraints", X[0] * X[1])
+        opt = builder.build(solver_hint=solver_hint)
+
+        derive_hessians = solver_hint in {None, "ipopt", "sqpmethod"}
+        assert opt.df is not None
+        assert opt.dh is not None
+        assert opt.dv is not None
+        for ddfun in [opt.ddf, opt.ddg, opt.ddh, opt.ddv]:
+            assert (ddfun is not None) == derive_hessians
+
+    def test_build_MX(self):
+        T = 10
+        task_model = optas.TaskModel("test", 2, time_derivs=[0, 1])
+        builder = optas.OptimizationBuilder(
+            T, tasks=task_model, derivs_align=True, expression_type="MX"
+        )
+        X = builder.get_model_states("test")
+        assert isinstance(X, optas.MX)
+        builder.add_cost_term("test_term", optas.sumsqr(X))
+        builder.add_bound_inequality_constraint("test_limits", -100, X, 100)
+        opt = builder.build()
+        assert isinstance(opt, optas.optimization.QuadraticCostLinearConstraints)
+        assert isinstance(opt.x, optas.MX)
+
+        x = optas.np.random.uniform(-1, 1, size=(opt.nx,))
+        assert optas.np.isclose(float(opt.f(x, [])), optas.np.sum(x[: 2 * T] ** 2))
+        P_known = optas.np.diag([1.0] * (2 * T) + [0.0] * (2 * T))
+        assert optas.np.isclose(opt.P([]).toarray(), P_known).all()
+
+        # Functions are expanded to SX for evaluation by default
+        assert opt.f.is_a("SXFunction")
+        assert opt.solver_options == {"expand": True}
+
+        builder = optas.OptimizationBuilder(
+            T, tasks=task_model, derivs_align=True, expression_type="MX", expand=False
+        )
+        X = builder.get_model_states("test")
+        builder.add_cost_term("test_term", optas.sumsqr(X))
+        opt = builder.build()
+        assert opt.f.is_a("MXFunction")
+        assert opt.solver_options == {}
+
+    @pytest.mark.skipif(shutil.which("gcc") is None, reason="requires gcc")
+    def test_build_jit(self):
+        files = set(os.listdir())
+        T = 10
+        task_model = optas.TaskModel("test", 2, time_derivs=[0, 1])
+        builder = optas.OptimizationBuilder(
+            T, tasks=task_model, derivs_align=True, jit=True, jit_cache_dir=None
+        )
+        X = builder.get_model_states("test")
+        builder.add_cost_term("test_term1", optas.sumsqr(X))
+        builder.add_cost_term("test_term2", optas.cos(X[0] * X[1]))
+        builder.add_equality_constraint("test_eq_constraints", X[0] * X[1])
+        opt = builder.build()
+        x = optas.np.random.uniform(-1, 1, size=(opt.nx,))
+        expected = optas.np.sum(x[: 2 * T] ** 2) + optas.np.cos(x[0] * x[1])
+        assert optas.np.isclose(float(opt.f(x, [])), expected)
+
+        # Generated code is removed from the working directory
+        del builder, opt
+        gc.collect()
+        assert set(os.listdir()) == files
+
+    @pytest.mark.skipif(shutil.which("gcc") is None, reason="requires gcc")
+    def test_build_jit_MX(self, tmp_path):
+        T = 4
+        for _ in range(2):  # the second build loads the functions from the cache
+            task_model = optas.TaskModel("test", 2)
+            builder = optas.OptimizationBuilder(
+                T,
+                tasks=task_model,
+                expression_type="MX",
+                jit=True,
+                jit_cache_dir=str(tmp_path),
+            )
+            X = builder.get_model_states("test")
+            builder.add_cost_term("cost", optas.sumsqr(X) + optas.cos(X[0, 0]))
+            opt = builder.build()
+
+            assert isinstance(opt, optas.optimization.NonlinearCostUnconstrained)
+            x = optas.np.random.uniform(-1, 1, size=(opt.nx,))
+            expected = optas.np.sum(x**2) + optas.np.cos(x[0])
+            assert optas.np.isclose(float(opt.f(x, [])), expected)
+            df = 2.0 * x
+            df[0] -= optas.np.sin(x[0])
+            assert optas.np.isclose(opt.df(x, []).toarray().flatten(), df).all()
+
+    @pytest.mark.skipif(shutil.which("gcc") is None, reason="requires gcc")
+    def test_build_aot(self, tmp_path):
+        T = 2
+        task_model = optas.TaskModel("test", 2, time_derivs=[0, 1])
+        builder = optas.OptimizationBuilder(T, tasks=task_model, derivs_align=True)
+        X = builder.get_model_states("test")
+        builder.add_cost_term("test_term1", optas.sumsqr(X))
+        builder.add_cost_term("test_term2", optas.cos(X[0] * X[1]))
+        builder.add_equality_constraint("test_eq_constraints", X[0] * X[1])
+        opt, paths = builder.build_aot(str(tmp_path), solver_hint="SLSQP")
+
+        assert {"f", "df", "g", "h", "dh", "v", "dv"} <= set(paths.keys())
+        assert "ddf" not in paths
+
+        x = optas.np.random.uniform(-1, 1, size=(opt.nx,))
+        for name in ["f", "df", "h", "dv"]:
+            assert os.path.isfile(paths[name])
+            fun = optas.external(name, paths[name])
+            expected = getattr(opt, name)(x, []).toarray()
+            assert optas.np.isclose(fun(x, []).toarray(), expected).all()
@@ -87,6 +87,7 @@ class Test_Model:
 
         assert model.state_name(0) == "test/x"
         assert model.state_name(1) == "test/dx"
+        assert model.state_name(1) is model.state_name(1)
 
         for _ in range(NUM_RANDOM):
             with pytest.raises(AssertionError):
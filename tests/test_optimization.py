@@ -1,6 +1,8 @@
 import optas
 from optas.sx_container import SXContainer
 import numpy as np
+import pytest
+import shutil
 
 NUM_RANDOM = 100
 
@@ -18,6 +20,72 @@ def isclose(A: np.ndarray, B: np.ndarray):
 #
 
 
+@pytest.mark.skipif(shutil.which("gcc") is None, reason="requires gcc")
+def test_create_function_jit_cse():
+    x = optas.SX.sym("x", 2)
+    f = optas.sin(x[0] + x[1]) + optas.cos(x[0] + x[1])
+    opts = {"jit": True, "compiler": "shell"}
+
+    fun = optas.optimization.create_function("fun", [x], [f])
+    fun_jit = optas.optimization.create_function("fun", [x], [f], opts)
+
+    # The repeated subexpression x[0] + x[1] is evaluated once
+    assert fun_jit.n_instructions() == fun.n_instructions() - 1
+    for _ in range(NUM_RANDOM):
+        x = np.random.uniform(-10, 10, size=(2,))
+        assert isclose(fun_jit(x).toarray(), fun(x).toarray())
+
+
+@pytest.mark.skipif(shutil.which("gcc") is None, reason="requires gcc")
+def test_create_function_cache(tmp_path):
+    x = optas.SX.sym("x", 2)
+    p = optas.SX.sym("p", 2)
+    f = p[0] * x[0] ** 2 + p[1] * x[1] ** 3
+    opts = {
+        "jit": True,
+        "compiler": "shell",
+        "jit_options": {"directory": str(tmp_path / "cache")},
+    }
+
+    fun = optas.optimization.create_function("fun", [x, p], [f], opts)
+    cached = list((tmp_path / "cache").glob("*.casadi"))
+    assert len(cached) == 1
+
+    fun_cached = optas.optimization.create_function("fun", [x, p], [f], opts)
+    assert list((tmp_path / "cache").glob("*.casadi")) == cached
+
+    optas.optimization.create_function("fun", [x, p], [2.0 * f], opts)
+    assert len(list((tmp_path / "cache").glob("*.casadi"))) == 2
+
+    fun_known = optas.Function("fun_known", [x, p], [f])
+    for _ in range(NUM_RANDOM):
+        x = np.random.uniform(-10, 10, size=(2,))
+        p = np.random.uniform(-10, 10, size=(2,))
+        assert isclose(fun(x, p).toarray(), fun_known(x, p).toarray())
+        assert isclose(fun_cached(x, p).toarray(), fun_known(x, p).toarray())
+
+
+@pytest.mark.skipif(shutil.which("gcc") is None, reason="requires gcc")
+def test_create_function_cache_missing_library(tmp_path):
+    x = optas.SX.sym("x", 2)
+    f = x[0] ** 2 + x[1] ** 3
+    opts = {
+        "jit": True,
+        "compiler": "shell",
+        "jit_options": {"directory": str(tmp_path)},
+    }
+
+    optas.optimization.create_function("fun", [x], [f], opts)
+    (cached,) = tmp_path.glob("*.casadi")
+    (library,) = tmp_path.glob("*.so")
+
+    library.unlink()
+    fun = optas.optimization.create_function("fun", [x], [f], opts)
+    assert len(list(tmp_path.glob("*.so"))) == 1
+    assert list(tmp_path.glob("*.casadi")) == [cached]
+    assert isclose(fun([2.0, 3.0]).toarray(), 31.0)
+
+
 def test_derive_jacobian_and_hessian_functions():
     name = "test"
     x = optas.SX.sym("x", 2)
@@ -41,6 +109,129 @@ def test_derive_jacobian_and_hessian_functions():
         assert isclose(Hes(x, p).toarray(), Hes_known(x, p).toarray())
 
 
+def test_derive_gradient_and_hessian_functions():
+    name = "test"
+    x = optas.SX.sym("x", 2)
+    p = optas.SX.sym("p", 2)
+
+    f = p[0] * x[0] ** 2 * x[1] + p[1] * x[1] ** 3
+    fun = optas.Function("fun", [x, p], [f])
+
+    Jac, Hes = optas.optimization.derive_gradient_and_hessian_functions(name, fun, x, p)
+
+    jac_known = optas.horzcat(
+        2.0 * p[0] * x[0] * x[1], p[0] * x[0] ** 2 + 3.0 * p[1] * x[1] ** 2
+    )
+    Jac_known = optas.Function("test_jac_known", [x, p], [jac_known])
+
+    hes_known = optas.vertcat(
+        optas.horzcat(2.0 * p[0] * x[1], 2.0 * p[0] * x[0]),
+        optas.horzcat(2.0 * p[0] * x[0], 6.0 * p[1] * x[1]),
+    )
+    Hes_known = optas.Function("test_hes_known", [x, p], [hes_known])
+
+    for _ in range(NUM_RANDOM):
+        x = np.random.uniform(-10, 10, size=(2,))
+        p = np.random.uniform(-10, 10, size=(2,))
+        assert isclose(Jac(x, p).toarray(), Jac_known(x, p).toarray())
+        assert isclose(Hes(x, p).toarray(), Hes_known(x, p).toarray())
+
+
+def test_derive_linear_jacobian_and_hessian_functions():
+    name = "test"
+    x = optas.SX.sym("x", 2)
+    p = optas.SX.sym("p", 2)
+
+    f = optas.vertcat(p[0] * x[0] + x[1], p[1] * x[1] - 2.0)
+    fun = optas.Function("fun", [x, p], [f])
+
+    Jac, Hes = optas.optimization.derive_linear_jacobian_and_hessian_functions(
+        name, fun, x, p
+    )
+
+    jac_known = optas.vertcat(
+        optas.horzcat(p[0], 1.0),
+        optas.horzcat(0.0, p[1]),
+    )
+    Jac_known = optas.Function("test_jac_known", [x, p], [jac_known])
+
+    assert Hes.sparsity_out(0).nnz() == 0
+
+    for _ in range(NUM_RANDOM):
+        x = np.random.uniform(-10, 10, size=(2,))
+        p = np.random.uniform(-10, 10, size=(2,))
+        assert isclose(Jac(x, p).toarray(), Jac_known(x, p).toarray())
+        assert isclose(Hes(x, p).toarray(), np.zeros((4, 2)))
+
+
+def test_derive_jacobian_transpose_times_function():
+    name = "test"
+    x = optas.SX.sym("x", 2)
+    p = optas.SX.sym("p", 2)
+
+    f = optas.vertcat(p[0] * x[0] ** 2, optas.sin(x[1]), p[1] * x[0] * x[1])
+    fun = optas.Function("fun", [x, p], [f])
+
+    JacT_v = optas.optimization.derive_jacobian_transpose_times_function(
+        name, fun, x, p
+    )
+    Jac = optas.Function("test_jac", [x, p], [optas.jacobian(f, x)])
+
+    assert JacT_v.name() == "dtest_transpose_times"
+
+    for _ in range(NUM_RANDOM):
+        x = np.random.uniform(-10, 10, size=(2,))
+        p = np.random.uniform(-10, 10, size=(2,))
+        v = np.random.uniform(-10, 10, size=(3,))
+        jtv_known = Jac(x, p).toarray().T @ v
+        assert isclose(JacT_v(x, p, v).toarray().flatten(), jtv_known)
+
+
+def test_derive_fused_function():
+    x = optas.SX.sym("x", 2)
+    p = optas.SX.sym("p", 2)
+
+    g = optas.vertcat(p[0] * x[0] ** 2, optas.sin(x[1]))
+    h = p[1] * x[0] * x[1]
+
+    gh = optas.optimization.derive_fused_function("gh", [g, h], x, p)
+    G = optas.Function("G", [x, p], [g, optas.jacobian(g, x)])
+    H = optas.Function("H", [x, p], [h, optas.jacobian(h, x)])
+
+    assert gh.n_out() == 4
+
+    for _ in range(NUM_RANDOM):
+        x = np.random.uniform(-10, 10, size=(2,))
+        p = np.random.uniform(-10, 10, size=(2,))
+        g_out, h_out, dg_out, dh_out = gh(x, p)
+        g_known, dg_known = G(x, p)
+        h_known, dh_known = H(x, p)
+        assert isclose(g_out.toarray(), g_known.toarray())
+        assert isclose(h_out.toarray(), h_known.toarray())
+        assert isclose(dg_out.toarray(), dg_known.toarray())
+        assert isclose(dh_out.toarray(), dh_known.toarray())
+
+
+def test_FunctionBuffer():
+    x = optas.SX.sym("x", 3)
+    p = optas.SX.sym("p")
+
+    f = p * optas.sumsqr(x)
+    jac = optas.jacobian(optas.vertcat(x[0] ** 2, p * x[2]), x)  # sparse
+    fun = optas.Function("fun", [x, p], [f, jac])
+
+    buffer = optas.optimization.FunctionBuffer(fun)
+
+    for _ in range(NUM_RANDOM):
+        x = np.random.uniform(-10, 10, size=(3,))
+        p = np.random.uniform(-10, 10)
+        out = buffer(x, p)
+        f_known, jac_known = fun(x, p)
+        assert out is buffer.out  # outputs are written in place
+        assert isclose(out[0], f_known.toarray())
+        assert isclose(out[1], jac_known.toarray())
+
+
 def test_vertcon():
     x = optas.SX.sym("x", 2)
     p = optas.SX.sym("p", 2)
@@ -113,6 +304,45 @@ def test_optimization():
         assert getattr(opt, attr) == exp_value
 
 
+@pytest.mark.parametrize("parallelization", ["serial", "thread"])
+def test_batch_evaluate(parallelization):
+    dv = SXContainer()
+    dv["x"] = optas.SX.sym("x", 2, 3)
+    x = dv.vec()
+
+    pr = SXContainer()
+    pr["p"] = optas.SX.sym("p")
+    p = pr.vec()
+
+    ct = SXContainer()
+    ct["c"] = p * optas.sumsqr(x)
+
+    opt = optas.optimization.Optimization(dv, pr, ct)
+
+    K = 5
+    X = np.random.uniform(-10, 10, size=(6, K))
+    P = np.random.uniform(-10, 10, size=(1, K))
+
+    f = opt.batch_evaluate("f", X, P, parallelization=parallelization)
+    df = opt.batch_evaluate("df", X, P[:, :1], parallelization=parallelization)[0]
+    assert f[0].shape == (1, K)
+    assert df.shape == (1, 6 * K)
+    for k in range(K):
+        assert isclose(f[0][:, k], opt.f(X[:, k], P[:, k]).toarray())
+        assert isclose(df[:, 6 * k : 6 * (k + 1)], opt.df(X[:, k], P[0, 0]).toarray())
+
+    assert len(opt._batched_functions) == 2
+
+    with pytest.raises(AssertionError):
+        opt.batch_evaluate("f", X)
+
+    ct = SXContainer()
+    ct["c"] = optas.sumsqr(x)
+    opt = optas.optimization.Optimization(dv, SXContainer(), ct)
+    f = opt.batch_evaluate("f", X, parallelization=parallelization)[0]
+    assert isclose(f, np.sum(X**2, axis=0))
+
+
 def test_QuadraticCostUnconstrained():
     dv = SXContainer()
     dv["x"] = optas.SX.sym("x", 2, 3)
@@ -141,6 +371,8 @@ def test_QuadraticCostUnconstrained():
         f = x.T @ P @ x + np.dot(q, x)
 
         assert isclose(f, fun_known(x, p))
+        assert isclose(opt.df(x, p).toarray().flatten(), 2.0 * p * x)
+        assert isclose(opt.ddf(x, p).toarray(), 2.0 * p * np.eye(6))
 
     attr_exp_value_map = {
         "nx": 6,
@@ -531,6 +763,31 @@ def test_NonlinearCostNonlinearConstraints():
     for attr, exp_value in attr_exp_value_map.items():
         assert getattr(opt, attr) == exp_value
 
+    assert set(opt.jac_sparsity.keys()) == {"f", "k", "a", "g", "h", "v"}
+    assert set(opt.hess_sparsity.keys()) == {"f", "g", "h", "v"}
+    jac_map = {
+        "f": opt.df,
+        "k": opt.M,
+        "a": opt.A,
+        "g": opt.dg,
+        "h": opt.dh,
+        "v": opt.dv,
+    }
+    for name, sparsity in opt.jac_sparsity.items():
+        assert sparsity == jac_map[name].sparsity_out(0)
+    for name, sparsity in opt.hess_sparsity.items():
+        assert sparsity == getattr(opt, "dd" + name).sparsity_out(0)
+
+    x = np.random.uniform(-10, 10, size=(6,))
+    p = np.random.uniform(-10, 10)
+    for name in ["g", "h", "v"]:
+        jtv = opt.get_jacobian_transpose_times(name)
+        assert jtv.name() == "d" + name + "_transpose_times"
+        assert opt.get_jacobian_transpose_times(name) is jtv
+        dfun = getattr(opt, "d" + name)(x, p).toarray()
+        u = np.random.uniform(-10, 10, size=(dfun.shape[0],))
+        assert isclose(jtv(x, p, u).toarray().flatten(), dfun.T @ u)
+
 
 def test_MixedIntegerNonlinearCostNonlinearConstrained():
     dv = SXContainer()
@@ -93,3 +93,41 @@ class TestSolverInterface(_SolverTester):
             opt = self.setup_optimization()
             solver = optas.ScipyMinimizeSolver(opt).setup(method=solver_name, tol=1e-6)
             self.solve_and_check_solution(solver, solver_name)
+
+    def test_scipy_minimize_nonlinear_constraints(self):
+        builder = optas.OptimizationBuilder(1)
+        x = builder.add_decision_variables("x", 2)
+        builder.add_cost_term("f", optas.sumsqr(x - optas.DM([1.0, 2.0])))
+        builder.add_geq_inequality_constraint("g", 1.0 - x[0] ** 2 - x[1] ** 2)
+        builder.add_equality_constraint("h", x[0] - x[1] ** 3)
+        opt = builder.build()
+        solver = optas.ScipyMinimizeSolver(opt).setup("trust-constr")
+        solver.reset_parameters({})
+
+        for _ in range(10):
+            x = np.random.uniform(-1, 1, size=(2,))
+            assert isclose(solver.g(x), opt.g(x, solver.p).toarray().flatten())
+            assert isclose(solver.dg(x), opt.dg(x, solver.p).toarray())
+            assert isclose(solver.h(x), opt.h(x, solver.p).toarray().flatten())
+            assert isclose(solver.dh(x), opt.dh(x, solver.p).toarray())
+
+    def test_scipy_minimize_quasi_newton_constraint_hessians(self):
+        builder = optas.OptimizationBuilder(1)
+        x = builder.add_decision_variables("x", 2)
+        builder.add_cost_term("f", optas.sumsqr(x - optas.DM([1.0, 2.0])))
+        builder.add_geq_inequality_constraint("g", 1.0 - x[0] ** 2 - x[1] ** 2)
+        builder.add_equality_constraint("h", x[0] - x[1] ** 3)
+        opt = builder.build(solver_hint="SLSQP")  # Hessians are not derived
+        assert opt.ddg is None and opt.ddh is None
+
+        # trust-constr approximates the constraint Hessians using BFGS
+        solver = optas.ScipyMinimizeSolver(opt).setup("trust-constr")
+        solver.reset_initial_seed({"x": [0.5, 0.5]})
+        solver.reset_parameters({})
+        result = solver.solve()
+        assert solver.did_solve()
+
+        solver = optas.CasADiSolver(opt).setup("ipopt", {"ipopt.print_level": 0})
+        solver.reset_initial_seed({"x": [0.5, 0.5]})
+        known = solver.solve()
+        assert np.isclose(result["x"].toarray(), known["x"].toarray(), atol=1e-4).all()
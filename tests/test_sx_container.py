@@ -36,6 +36,23 @@ def test_setitem():
 def test_vec():
     a = SXContainer({"xa": optas.SX.sym("xa"), "ya": optas.SX.sym("ya")})
     assert a.vec().numel() == 2
+    assert a.vec() is a.vec()  # vectorized form is cached
+    a["za"] = optas.SX.sym("za")
+    assert a.vec().numel() == 3
+
+    # cache is invalidated when items are removed
+    del a["za"]
+    assert a.vec().numel() == 2
+    a.pop("ya")
+    assert a.vec().numel() == 1
+    a.popitem()
+    assert a.vec().numel() == 0
+    a["xa"] = optas.SX.sym("xa", 2)
+    assert a.vec().numel() == 2
+    a.clear()
+    assert a.vec().numel() == 0
+    a.update({"xa": optas.SX.sym("xa", 3)})
+    assert a.vec().numel() == 3
 
 
 def test_dict2vec_vec2dict():